@@ -1,13 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, abort
+import time
+_PROCESS_T0 = time.perf_counter()   # cold-start reference point (see STARTUP_TIMINGS)
+
+from flask import Flask, render_template, request, redirect, url_for, abort, stream_with_context, send_file, send_from_directory
+from werkzeug.utils import secure_filename
+import click
+from markupsafe import Markup, escape
 import sqlite3
 
 from pathlib import Path
 import re
-import spacy
+import os
+import posixpath
+import tempfile
+import io
+import csv
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import gzip
+import mimetypes
+import gc
 from flask import jsonify, request, g
 import sqlite3
 import json
+import base64
+import threading
+import bisect
+import math
+from collections import Counter, OrderedDict
+import functools
+import unicodedata
 from datetime import datetime
+from fractions import Fraction
+import numpy as np
+import prometheus_client as prom
+from prometheus_client import multiprocess as prom_multiprocess
+import requests
 
 
 import json
@@ -15,34 +44,335 @@ from pathlib import Path
 
 TAGS_PATH = Path(__file__).with_name("tags.json")
 
+
+class TagConfig:
+    """
+    Parsed tags.json, cached per process.
+    Each read costs one stat(); the file is only re-parsed when its mtime or
+    size changes (e.g. another worker saved it). Writes go to a temp file and
+    are renamed into place, so readers never see a half-written document.
+    The returned dict is shared — treat it as read-only.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self._key = None
+
+    def _stat_key(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self) -> dict:
+        key = self._stat_key()
+        if key == self._key:
+            return self._data
+        with self._lock:
+            if key is None:
+                self._data, self._key = {}, None
+                return self._data
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+                self._key = key
+            except (OSError, json.JSONDecodeError) as e:
+                print("⚠️ Error loading tags.json:", e)
+            return self._data
+
+    def save(self, data: dict):
+        with self._lock:
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tags.", suffix=".json")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+            self._data = data
+            self._key = self._stat_key()
+
+    def exists(self) -> bool:
+        return self._stat_key() is not None
+
+    def version(self):
+        """Changes whenever tags.json does (cache key for rendered pages)."""
+        return self._stat_key()
+
+    def quick_access(self, default=()):
+        """Tags for the homepage Quick Access buttons."""
+        if not self.exists():
+            return list(default)
+        return self.get().get("Quick Access", [])
+
+
+tag_config = TagConfig(TAGS_PATH)
+
+
 def load_tags_json():
-    if TAGS_PATH.exists():
-        with TAGS_PATH.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return tag_config.get()
 
 def save_tags_json(data: dict):
-    with TAGS_PATH.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    tag_config.save(data)
 
-DB_PATH = "recipes_v2.db"
+DB_PATH = os.environ.get("RECIPES_DB") or str(Path(__file__).with_name("recipes_v2.db"))
 app = Flask(__name__)
 
-from flask import g
+from flask import g, has_app_context
 import sqlite3
 
-DATABASE = "recipes_v2.db"
+DATABASE = DB_PATH
+
+# Connection tuning for the Pi's SD card:
+#  - WAL lets readers keep going while the planner writes, and turns most
+#    commits into one sequential append instead of two random-write fsyncs.
+#  - synchronous=NORMAL is safe under WAL (a power cut can lose the last
+#    commit, never corrupt the file).
+#  - cache_size is in KiB when negative; mmap lets reads skip a copy.
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+_wal_enabled = False
+_local = threading.local()
+
+
+# ---------------------------
+# Request / SQL metrics (Prometheus text at /metrics)
+# ---------------------------
+# Off until the first scrape (or RECIPES_METRICS=1), so a Pi nobody is
+# watching pays one attribute check per request and per connection opened.
+# Long-lived thread connections opened before then stay uninstrumented.
+# Under gunicorn, gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR: each worker
+# writes its samples to files there and /metrics, whichever worker answers,
+# reports the sum (prometheus_client's multiprocess mode). The first scrape
+# leaves an "enabled" marker in that directory, which the other workers
+# pick up within METRICS_POLL_S.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+METRICS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+METRICS_POLL_S = 1.0
+
+
+class RequestMetrics:
+    """
+    Per-endpoint latency histograms plus SQLite statement counts and time.
+    Statements are attributed to the request running on the current thread;
+    anything else (startup, SSE watcher, CLI) is reported as "background".
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._next_poll = 0.0
+        self.latency = prom.Histogram(
+            "recipes_http_request_duration_seconds", "Request latency by endpoint.",
+            ["endpoint", "method"], buckets=LATENCY_BUCKETS)
+        self.requests = prom.Counter(
+            "recipes_http_requests", "Requests by endpoint and status.", ["endpoint", "method", "status"])
+        self.statements = prom.Histogram(
+            "recipes_sql_statements_per_request", "SQLite statements issued per request.",
+            ["endpoint"], buckets=STATEMENT_BUCKETS)
+        self.sql_statements = prom.Counter(
+            "recipes_sql_statements", "SQLite statements by endpoint.", ["endpoint"])
+        self.sql_seconds = prom.Counter(
+            "recipes_sql_seconds", "Time spent in SQLite calls by endpoint.", ["endpoint"])
+        self.page_cache = prom.Counter(
+            "recipes_page_cache_requests", "Rendered-page cache lookups.", ["result"])
+        self.page_cache_bytes = prom.Gauge(
+            "recipes_page_cache_bytes", "Bytes of rendered pages held.", multiprocess_mode="livesum")
+        self.startup = prom.Gauge(
+            "recipes_startup_seconds", "Cold-start timings per process.", ["phase"],
+            multiprocess_mode="liveall")
+
+    def enable(self):
+        """Switch collection on (in every gunicorn worker, via the marker file)."""
+        if METRICS_MULTIPROC_DIR:
+            Path(METRICS_MULTIPROC_DIR, "enabled").touch()
+        if not self.enabled:
+            self.enabled = True
+            self.export_startup()
+
+    def poll(self):
+        """Per request while off: has another worker been scraped? (one stat per METRICS_POLL_S)"""
+        if not METRICS_MULTIPROC_DIR:
+            return
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + METRICS_POLL_S
+            if os.path.exists(os.path.join(METRICS_MULTIPROC_DIR, "enabled")):
+                self.enable()
+
+    def export_startup(self):
+        for phase, value in STARTUP_TIMINGS.items():
+            if isinstance(value, (int, float)):
+                self.startup.labels(phase).set(value)
+
+    # --- hooks ---
+    def start_request(self):
+        self._local.stats = [0, 0.0, None]   # statements, sql seconds, last sql text
+        self._local.t0 = time.perf_counter()
+
+    def finish_request(self, endpoint, method, status):
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - self._local.t0
+        self._local.stats = None
+        self.latency.labels(endpoint, method).observe(elapsed)
+        self.statements.labels(endpoint).observe(stats[0])
+        self.requests.labels(endpoint, method, str(status)).inc()
+        self.sql_statements.labels(endpoint).inc(stats[0])
+        self.sql_seconds.labels(endpoint).inc(stats[1])
+
+    def trace(self, sql):
+        """sqlite3 trace callback: count statements for the current request."""
+        # "-- ..." lines are SQLite's own nested statements (FTS5 shadow tables)
+        if not self.enabled or sql.startswith(("PRAGMA", "--")):
+            return
+        stats = getattr(self._local, "stats", None)
+        # trigger programs are reported as repeats of their parent statement
+        if stats is not None:
+            if sql != stats[2]:
+                stats[0] += 1
+                stats[2] = sql
+        else:
+            self.sql_statements.labels("background").inc()
+
+    def add_sql_time(self, seconds):
+        stats = getattr(self._local, "stats", None)
+        if stats is not None:
+            stats[1] += seconds
+        else:
+            self.sql_seconds.labels("background").inc(seconds)
+
+    def render(self):
+        """(body, content type) for /metrics: all workers under gunicorn, else this process."""
+        self.export_startup()
+        if METRICS_MULTIPROC_DIR:
+            registry = prom.CollectorRegistry()
+            prom_multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prom.REGISTRY
+        return prom.generate_latest(registry), prom.CONTENT_TYPE_LATEST
+
+
+request_metrics = RequestMetrics(enabled=os.environ.get("RECIPES_METRICS") == "1")
+
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that adds its SQLite time (execute, fetch, step) to request_metrics.
+    Only used once collection is on; see connect_db().
+    """
+
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchmany(size or self.arraysize)
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            return super().__next__()
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute shortcuts) are timed."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            request_metrics.add_sql_time(time.perf_counter() - t0)
+
+
+def connect_db(path=None):
+    """Open a tuned connection (WAL + pragmas). Most code wants get_conn()."""
+    global _wal_enabled
+    # Until something scrapes /metrics, connections are plain: the Python-level
+    # cursor overrides and trace callback cost more than the statements they
+    # time. Request connections are opened per request, so they pick the
+    # instrumented ones up right after the first scrape.
+    instrumented = request_metrics.enabled
+    conn = sqlite3.connect(path or DATABASE, timeout=5.0,
+                           factory=InstrumentedConnection if instrumented else sqlite3.Connection)
+    conn.row_factory = sqlite3.Row
+    if instrumented:
+        conn.set_trace_callback(request_metrics.trace)
+    if not _wal_enabled:
+        # journal_mode is stored in the file itself, so once per process is enough
+        conn.execute("PRAGMA journal_mode = WAL")
+        _wal_enabled = True
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
 
 def get_db():
+    """The connection for the current request (opened on first use)."""
     db = getattr(g, "_database", None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
+        db = g._database = connect_db()
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, "_database", None)
+    db = g.pop("_database", None)
     if db is not None:
         db.close()
 
@@ -52,15 +382,261 @@ def query_db(query, args=(), one=False):
     cur.close()
     return (rv[0] if rv else None) if one else rv
 
-# spaCy is used for text normalization and will power OCR imports later.
-# Load spaCy model once
-nlp = spacy.load("en_core_web_sm")
+# spaCy is used for text normalization and notebook transcription imports.
+# It is loaded lazily on first real use — importing spaCy and the model takes
+# several seconds on the Pi, and most requests (planner, shopping list) never
+# need it. Only the components we use are enabled: tok2vec (doc vectors),
+# tagger + attribute_ruler + lemmatizer (lemmas). No parser, no NER.
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "en_core_web_sm")
+SPACY_EXCLUDE = ["parser", "ner", "senter"]
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+STARTUP_TIMINGS = {}
+_forked = False            # a gunicorn worker (set by after_fork)
+_first_request_t0 = None
+
+
+def get_nlp():
+    """Return the shared spaCy pipeline, loading it on first call."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                t0 = time.perf_counter()
+                import spacy
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+                STARTUP_TIMINGS["nlp_load_s"] = round(time.perf_counter() - t0, 3)
+                print(f"🧠 spaCy '{SPACY_MODEL}' loaded in {STARTUP_TIMINGS['nlp_load_s']}s "
+                      f"(pipes: {', '.join(_nlp.pipe_names)})")
+    return _nlp
+
+
+def start_nlp_preload():
+    """Warm spaCy in a daemon thread so the server can take requests meanwhile."""
+    def _preload():
+        try:
+            get_nlp()
+        except Exception as e:
+            print("⚠️ spaCy preload failed:", e)
+    threading.Thread(target=_preload, name="nlp-preload", daemon=True).start()
+
+
+@app.after_request
+def record_first_response(response):
+    """Log import-to-first-response once per process (cold start tracking)."""
+    if "first_response_s" not in STARTUP_TIMINGS:
+        # gunicorn workers fork already warm: their cold start is the first request
+        t0 = _first_request_t0 if _first_request_t0 is not None else _PROCESS_T0
+        STARTUP_TIMINGS["first_response_s"] = round(time.perf_counter() - t0, 3)
+        STARTUP_TIMINGS["first_endpoint"] = request.endpoint
+        print(f"⏱️ Cold start: first response after {STARTUP_TIMINGS['first_response_s']}s "
+              f"({request.endpoint})")
+    return response
+
+
+@app.before_request
+def note_first_request():
+    global _first_request_t0
+    if _forked and _first_request_t0 is None:
+        _first_request_t0 = time.perf_counter()
+
+
+@app.before_request
+def start_request_metrics():
+    if not request_metrics.enabled:
+        request_metrics.poll()
+    if request_metrics.enabled:
+        request_metrics.start_request()
+
+
+@app.after_request
+def record_request_metrics(response):
+    if request_metrics.enabled:
+        request_metrics.finish_request(request.endpoint or "unmatched", request.method,
+                                       response.status_code)
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus text exposition. The first scrape switches collection on."""
+    request_metrics.enable()
+    body, content_type = request_metrics.render()
+    return body, 200, {"Content-Type": content_type}
+
+
+@app.route("/api/startup")
+def api_startup():
+    """Cold-start timings for this process (seconds since module import began)."""
+    return jsonify({
+        **STARTUP_TIMINGS,
+        "nlp_loaded": _nlp is not None,
+        "uptime_s": round(time.perf_counter() - _PROCESS_T0, 3),
+    })
 
 # ---------------------------
 # Database helpers
 # ---------------------------
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    """
+    Shared connection: the request's one inside Flask, otherwise one per
+    thread (startup, CLI helpers, background workers). Never close it —
+    `with get_conn() as conn:` only commits / rolls back.
+    """
+    if has_app_context():
+        return get_db()
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = connect_db()
+    return conn
+
+# ---------------------------
+# Rendered-page cache
+# ---------------------------
+# Recipes change a few times a week; home, search and recipe pages are read
+# all day. Rendered HTML is kept per (path, query) for one data version:
+# the version is a stamp file next to the database that every recipe/tag
+# write replaces, plus tags.json's stat. Checking it is two stat() calls,
+# so a repeat view never opens SQLite or runs Jinja, and a write from any
+# worker process invalidates every worker's cache.
+PAGE_CACHE_BYTES = int(os.environ.get("PAGE_CACHE_BYTES", 8 * 1024 * 1024))
+DATA_VERSION_PATH = Path(DB_PATH + ".version")
+
+
+class StampFile:
+    """A file replaced on every touch(); its stat is a cross-process token."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def stamp(self):
+        try:
+            st = self.path.stat()
+            return st.st_ino, st.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def touch(self):
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(str(time.time_ns()))
+            os.replace(tmp, self.path)   # new inode: the stamp always changes
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+class DataVersion(StampFile):
+    """Cross-process token for "recipes or tags changed"."""
+
+    def token(self):
+        return self.stamp(), tag_config.version()
+
+    def bump(self):
+        """Call after committing a write that changes what recipe pages show."""
+        self.touch()
+        page_cache.clear()
+
+
+class PageCache:
+    """
+    LRU of rendered responses bounded by total body bytes. All entries
+    belong to one data version; seeing a newer token drops them all.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (body, mimetype)
+        self._bytes = 0
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+
+    def _reset(self, token):
+        self._entries.clear()
+        self._bytes = 0
+        self._token = token
+        request_metrics.page_cache_bytes.set(0)   # a gauge: kept current even while off
+
+    def get(self, key, token):
+        with self._lock:
+            if token != self._token:
+                self._reset(token)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if request_metrics.enabled:
+            request_metrics.page_cache.labels("miss" if entry is None else "hit").inc()
+        return entry
+
+    def put(self, key, token, body: bytes, mimetype: str):
+        # one giant page shouldn't flush everything else
+        if len(body) > self.max_bytes // 8:
+            return
+        with self._lock:
+            if token != self._token:
+                self._reset(token)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (body, mimetype)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+            request_metrics.page_cache_bytes.set(self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._reset(None)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+data_version = DataVersion(DATA_VERSION_PATH)
+page_cache = PageCache(PAGE_CACHE_BYTES)
+
+
+def cached_page(view=None, *, vary=None):
+    """
+    Serve GET 200s of `view` from page_cache while the data version holds.
+    `vary` (a StampFile) joins the key: touching it retires just this view's
+    pages, which then age out of the LRU, instead of clearing the cache.
+    """
+    if view is None:
+        return functools.partial(cached_page, vary=vary)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET" or PAGE_CACHE_BYTES <= 0:
+            return view(*args, **kwargs)
+        key = (request.path, tuple(sorted(request.args.items(multi=True))),
+               vary.stamp() if vary else None)
+        token = data_version.token()
+        hit = page_cache.get(key, token)
+        if hit is not None:
+            response = app.response_class(hit[0], mimetype=hit[1])
+            response.headers["X-Page-Cache"] = "hit"
+            return response
+
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            page_cache.put(key, token, response.get_data(), response.mimetype)
+        response.headers["X-Page-Cache"] = "miss"
+        return response
+    return wrapper
+
 
 # === JSON field helpers ===
 import json
@@ -101,6 +677,8 @@ def init_db():
             ("method", "ALTER TABLE recipes ADD COLUMN method TEXT"),
             ("image_url", "ALTER TABLE recipes ADD COLUMN image_url TEXT"),
             ("tags", "ALTER TABLE recipes ADD COLUMN tags TEXT"),
+            ("linked_recipe", "ALTER TABLE recipes ADD COLUMN linked_recipe TEXT"),
+            ("notes", "ALTER TABLE recipes ADD COLUMN notes TEXT"),
         ]:
             if col not in cols:
                 try:
@@ -108,12 +686,14 @@ def init_db():
                     conn.commit()
                 except Exception as e:
                     print(f"⚠️ Skipped adding {col}: {e}")
+        # keyset pagination walks (name, id); the rowid rides along in the index
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recipes_name ON recipes(name)")
 
         # --- shopping_list table ---
         c.execute("""
             CREATE TABLE IF NOT EXISTS shopping_list (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
+                name TEXT NOT NULL UNIQUE,
                 category TEXT,
                 amount TEXT,
                 checked INTEGER DEFAULT 1,
@@ -132,6 +712,8 @@ def init_db():
             ("crossed", "ALTER TABLE shopping_list ADD COLUMN crossed INTEGER DEFAULT 0"),
             ("active", "ALTER TABLE shopping_list ADD COLUMN active INTEGER DEFAULT 1"),
             ("updated_at", "ALTER TABLE shopping_list ADD COLUMN updated_at TIMESTAMP"),
+            ("version", "ALTER TABLE shopping_list ADD COLUMN version INTEGER NOT NULL DEFAULT 0"),
+            ("times_added", "ALTER TABLE shopping_list ADD COLUMN times_added INTEGER NOT NULL DEFAULT 1"),
         ]:
             if col not in cols:
                 try:
@@ -143,6 +725,34 @@ def init_db():
                 except Exception as e:
                     print(f"⚠️ Skipped adding {col}: {e}")
 
+        # --- shopping list change versions (ETag / ?since= deltas) ---
+        init_shopping_sync(conn)
+
+        # --- full-text search index ---
+        init_search_index(conn)
+
+        # --- precomputed recipe vectors (semantic search) ---
+        init_vector_table(conn)
+
+        # --- normalized tag index (tag cloud + tag search) ---
+        init_tags_table(conn)
+
+        # --- parsed ingredient lines ---
+        init_ingredients_table(conn)
+
+        # --- similar-recipes graph (after the tables its triggers watch) ---
+        init_similar_table(conn)
+
+        # --- name/ingredient word counter (typo-tolerant search index) ---
+        init_recipe_words_version(conn)
+
+        # --- bulk import checkpoints + transcription staging ---
+        init_import_table(conn)
+        init_staging_table(conn)
+
+        # --- fetched recipe images (url -> content hash) ---
+        init_image_cache_table(conn)
+
 
 
 
@@ -162,7 +772,12 @@ def update_recipe(recipe_id, name, ingredients, method, image_url, tags, linked_
                 updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (name, ingredients, method, image_url, tags, linked_recipe, notes, recipe_id))
+        store_recipe_vector(conn, recipe_id, name, ingredients, method)
+        store_recipe_tags(conn, recipe_id, tags)
+        store_recipe_ingredients(conn, recipe_id, ingredients)
         conn.commit()
+    data_version.bump()
+    similar_worker.kick()
 
 
 
@@ -185,7 +800,13 @@ def delete_recipe(recipe_id: int):
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+        drop_recipe_vector(conn, recipe_id)
+        c.execute("DELETE FROM recipe_tags WHERE recipe_id = ?", (recipe_id,))
+        c.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+        bump_recipe_words(conn)
         conn.commit()
+    data_version.bump()
+    similar_worker.kick()
 
 
 def add_recipe_to_db(name, ingredients, method, image_url, tags):
@@ -195,7 +816,14 @@ def add_recipe_to_db(name, ingredients, method, image_url, tags):
             "INSERT INTO recipes (name, ingredients, method, image_url, tags) VALUES (?, ?, ?, ?, ?)",
             (name, ingredients, method, image_url, tags),
         )
+        recipe_id = c.lastrowid
+        bump_recipe_words(conn)
+        store_recipe_vector(conn, recipe_id, name, ingredients, method)
+        store_recipe_tags(conn, recipe_id, tags)
+        store_recipe_ingredients(conn, recipe_id, ingredients)
         conn.commit()
+    data_version.bump()
+    similar_worker.kick()
 
 # ---------------------------
 # Ingredient parsing helpers
@@ -231,12 +859,13 @@ def parse_ingredient_line(line: str):
     s = _normalize_fractions(original)
 
     # Try to capture amount (number or fraction), optional unit, then item
-    # amount can be: 200 | 1/2 | 1 1/2 | 0.5
+    # amount can be: 1 1/2 | 1/2 | 200 | 0.5  (longest forms first)
+    # the unit must be a whole word, so 'onion' is never split into 'onio' + 'n'
     m = re.match(
         r"""^\s*
-        (?P<amount>(\d+(?:\.\d+)?)|(\d+\s+\d+/\d+)|(\d+/\d+))?
+        (?P<amount>(\d+\s+\d+/\d+)|(\d+/\d+)|(\d+(?:\.\d+)?))?
         \s*
-        (?P<unit>[a-zA-Z]+(?:\s*oz)?)?
+        (?P<unit>[a-zA-Z]+(?:\s*oz)?\b)?
         \s*
         (?P<rest>.+?)
         \s*$""",
@@ -247,10 +876,10 @@ def parse_ingredient_line(line: str):
 
     if m:
         amount = (m.group("amount") or "").strip()
-        unit = (m.group("unit") or "").strip().lower()
+        unit = re.sub(r"\s+", " ", (m.group("unit") or "").strip().lower())
         rest = (m.group("rest") or "").strip()
-        # If unit isn't a known unit and we have an amount, maybe unit actually part of item
-        if unit and unit not in UNITS and amount:
+        # If unit isn't a known unit, it's actually the first word of the item
+        if unit and unit not in UNITS:
             rest = (unit + " " + rest).strip()
             unit = ""
         # Split item vs note on comma
@@ -273,6 +902,272 @@ def parse_ingredients_block(block: str):
             parsed.append(p)
     return parsed
 
+
+def split_ingredient_lines(value):
+    """
+    Turn a stored ingredients value into display lines.
+    Handles JSON lists (including double-encoded JSON), plain text split on
+    newlines/commas, and half-broken JSON (brackets/quotes stripped).
+    """
+    try:
+        if value and value.strip().startswith("["):
+            lines = json.loads(value)
+            if isinstance(lines, str):
+                lines = json.loads(lines)
+        else:
+            text = (value or "").replace(",", "\n")
+            lines = [i.strip() for i in text.splitlines() if i.strip()]
+    except Exception:
+        text = (value or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
+        lines = [i.strip() for i in text.splitlines() if i.strip()]
+
+    if not isinstance(lines, list):
+        lines = [lines]
+    return [s for s in (str(i).strip() for i in lines) if s]
+
+
+# ---------------------------
+# Structured ingredient store
+# ---------------------------
+# recipe_ingredients holds every recipe's ingredient lines already split and
+# parsed, so pages and the planner read rows instead of re-sniffing the raw
+# ingredients column on each request.
+# Bump when parse_ingredient_line() changes so stored rows get re-parsed.
+INGREDIENT_PARSER_VERSION = 2
+def init_ingredients_table(conn):
+    """Create recipe_ingredients; backfill it from recipes when new."""
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='recipe_ingredients'")
+    exists = c.fetchone() is not None
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            raw TEXT NOT NULL,
+            amount TEXT,
+            unit TEXT,
+            item TEXT,
+            note TEXT,
+            PRIMARY KEY (recipe_id, position)
+        ) WITHOUT ROWID
+    """)
+    # Re-parse everything when parse_ingredient_line() has changed since the
+    # rows were written (version kept in sync_state).
+    c.execute("SELECT version FROM sync_state WHERE name = 'ingredient_parser'")
+    row = c.fetchone()
+    if not exists or row is None or row[0] != INGREDIENT_PARSER_VERSION:
+        rebuild_recipe_ingredients(conn)
+        c.execute("""
+            INSERT INTO sync_state (name, version) VALUES ('ingredient_parser', ?)
+            ON CONFLICT(name) DO UPDATE SET version = excluded.version
+        """, (INGREDIENT_PARSER_VERSION,))
+    conn.commit()
+
+
+def _ingredient_rows(recipe_id, value):
+    rows = []
+    for pos, line in enumerate(split_ingredient_lines(value)):
+        p = parse_ingredient_line(line) or {}
+        rows.append((recipe_id, pos, line, p.get("amount", ""), p.get("unit", ""),
+                     p.get("item", line), p.get("note", "")))
+    return rows
+
+
+_INSERT_INGREDIENT = """
+    INSERT INTO recipe_ingredients (recipe_id, position, raw, amount, unit, item, note)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def store_recipe_ingredients(conn, recipe_id, value):
+    """
+    Replace one recipe's parsed lines (write-time hook for add/update).
+    Leaves them alone when nothing parsed differently, so a tags/notes edit
+    neither queues the similar-recipes drain nor moves 'recipe_words'.
+    """
+    rows = _ingredient_rows(recipe_id, value)
+    old = [tuple(r) for r in conn.execute("""
+        SELECT recipe_id, position, raw, amount, unit, item, note
+          FROM recipe_ingredients WHERE recipe_id = ? ORDER BY position
+    """, (recipe_id,))]
+    if old == rows:
+        return
+    conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+    conn.executemany(_INSERT_INGREDIENT, rows)
+    if _item_words(r[5] for r in old) != _item_words(r[5] for r in rows):
+        bump_recipe_words(conn)
+
+
+def rebuild_recipe_ingredients(conn):
+    """Backfill recipe_ingredients for every recipe."""
+    recipes = conn.execute("SELECT id, ingredients FROM recipes").fetchall()
+    conn.execute("DELETE FROM recipe_ingredients")
+    for rid, value in recipes:
+        conn.executemany(_INSERT_INGREDIENT, _ingredient_rows(rid, value))
+    bump_recipe_words(conn)
+    return len(recipes)
+
+
+def get_recipe_ingredients(conn, recipe_ids):
+    """{recipe_id: [row, ...]} in display order, one indexed query."""
+    recipe_ids = list(recipe_ids)
+    out = {rid: [] for rid in recipe_ids}
+    if not recipe_ids:
+        return out
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT recipe_id, position, raw, amount, unit, item, note
+          FROM recipe_ingredients
+         WHERE recipe_id IN ({','.join(['?'] * len(recipe_ids))})
+         ORDER BY recipe_id, position
+    """, recipe_ids)
+    for row in c.fetchall():
+        out.setdefault(row["recipe_id"], []).append(row)
+    return out
+
+
+@app.cli.command("rebuild-ingredients")
+def rebuild_ingredients_command():
+    """Re-parse every recipe's ingredients into recipe_ingredients."""
+    init_db()
+    with get_conn() as conn:
+        count = rebuild_recipe_ingredients(conn)
+        conn.commit()
+    data_version.bump()
+    print(f"✅ Ingredients re-parsed for {count} recipes.")
+
+
+# ---------------------------
+# Ingredient aggregation (multi-recipe plans)
+# ---------------------------
+# unit -> (dimension, factor to that dimension's base unit: g / ml / 1)
+UNIT_CONVERSIONS = {
+    "mg": ("mass", 0.001), "g": ("mass", 1.0), "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495), "lb": ("mass", 453.592), "lbs": ("mass", 453.592),
+    "pound": ("mass", 453.592), "pounds": ("mass", 453.592),
+    "ml": ("volume", 1.0), "l": ("volume", 1000.0), "fl oz": ("volume", 29.5735),
+    "tsp": ("volume", 4.92892), "tbsp": ("volume", 14.7868),
+    "cup": ("volume", 240.0), "cups": ("volume", 240.0),
+    "clove": ("clove", 1.0), "cloves": ("clove", 1.0),
+    "slice": ("slice", 1.0), "slices": ("slice", 1.0),
+    "can": ("tin", 1.0), "cans": ("tin", 1.0), "tin": ("tin", 1.0), "tins": ("tin", 1.0),
+    "pack": ("pack", 1.0), "packs": ("pack", 1.0),
+}
+IMPERIAL_MASS = {"oz", "lb", "lbs", "pound", "pounds"}
+SPOON_UNITS = {"tsp", "tbsp", "cup", "cups"}
+
+
+def _amount_value(amount):
+    """'1 1/2' -> 1.5, '200' -> 200.0, '' or junk -> None."""
+    try:
+        return float(sum(Fraction(part) for part in (amount or "").split())) or None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def canonical_item(item):
+    """Grouping key for an ingredient name: 'Chopped Tomatoes (tinned)' -> 'chopped tomato'."""
+    s = re.sub(r"\([^)]*\)", " ", (item or "").lower())
+    words = re.sub(r"[^a-z0-9&' -]+", " ", s).split()
+    if not words:
+        return ""
+    last = words[-1]
+    if last.endswith("ies") and len(last) > 4:
+        last = last[:-3] + "y"
+    elif last.endswith("oes") and len(last) > 4:
+        last = last[:-2]
+    elif last.endswith("s") and not last.endswith("ss") and len(last) > 3:
+        last = last[:-1]
+    return " ".join(words[:-1] + [last])
+
+
+def _format_amount(x):
+    return f"{x:.2f}".rstrip("0").rstrip(".") if x else ""
+
+
+def _display_quantity(dimension, total, units_used):
+    """Pick a readable unit for a base-unit total: (amount_str, unit)."""
+    if dimension == "mass":
+        if units_used <= IMPERIAL_MASS:
+            oz = total / 28.3495
+            return (_format_amount(oz / 16), "lb") if oz >= 16 else (_format_amount(oz), "oz")
+        return (_format_amount(total / 1000), "kg") if total >= 1000 else (_format_amount(total), "g")
+    if dimension == "volume":
+        if units_used <= SPOON_UNITS:
+            if total >= 60:
+                return _format_amount(total / 240), "cups"
+            if total >= 14.7868:
+                return _format_amount(total / 14.7868), "tbsp"
+            return _format_amount(total / 4.92892), "tsp"
+        if units_used == {"fl oz"}:
+            return _format_amount(total / 29.5735), "fl oz"
+        return (_format_amount(total / 1000), "l") if total >= 1000 else (_format_amount(total), "ml")
+    if dimension == "each":
+        return _format_amount(total), ""
+    return _format_amount(total), dimension if total == 1 else dimension + "s"
+
+
+def aggregate_ingredients(lines, recipe_names, multiplier):
+    """
+    Merge parsed ingredient rows from several recipes into one list.
+    `lines` is {recipe_id: [recipe_ingredients rows]}, `multiplier` is
+    {recipe_id: times the recipe is planned}. Lines are grouped by
+    (canonical item, unit dimension), converted to base units and summed
+    in one NumPy pass. Each total lists the recipe lines it came from.
+    """
+    keys, key_index = [], {}
+    idx, qty, sources = [], [], []
+
+    for rid, rows in lines.items():
+        times = multiplier.get(rid, 1)
+        for r in rows:
+            item = canonical_item(r["item"] or r["raw"])
+            if not item:
+                continue
+            value = _amount_value(r["amount"])
+            dimension, factor = UNIT_CONVERSIONS.get(r["unit"] or "", ("each", 1.0))
+            if value is None:
+                dimension = "each" if not r["unit"] else dimension
+            key = (item, dimension)
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append({"item": item, "dimension": dimension, "units": set(), "sources": []})
+            entry = keys[key_index[key]]
+            if r["unit"]:
+                entry["units"].add(r["unit"])
+            entry["sources"].append({
+                "recipe_id": rid, "recipe": recipe_names.get(rid, ""),
+                "line": r["raw"], "times": times,
+            })
+            idx.append(key_index[key])
+            qty.append(np.nan if value is None else value * factor * times)
+
+    if not keys:
+        return []
+
+    idx = np.asarray(idx, dtype=np.intp)
+    qty = np.asarray(qty, dtype=np.float64)
+    known = ~np.isnan(qty)
+    totals = np.bincount(idx, weights=np.where(known, qty, 0.0), minlength=len(keys))
+    quantified = np.bincount(idx, weights=known.astype(np.float64), minlength=len(keys))
+    counts = np.bincount(idx, minlength=len(keys))
+
+    merged = []
+    for i, entry in enumerate(keys):
+        amount, unit = ("", "")
+        if quantified[i]:
+            amount, unit = _display_quantity(entry["dimension"], float(totals[i]), entry["units"])
+        text = " ".join(p for p in (amount, unit, entry["item"]) if p)
+        merged.append({
+            "item": entry["item"],
+            "amount": amount,
+            "unit": unit,
+            "text": text,
+            "partial": bool(quantified[i] and quantified[i] < counts[i]),
+            "sources": entry["sources"],
+        })
+    return sorted(merged, key=lambda m: (m["item"], m["unit"]))
+
 # ---------------------------
 # Search helpers
 # ---------------------------
@@ -288,6 +1183,7 @@ def recipe_score(query: str, name: str, ingredients: str, method: str) -> float:
     """
     # Defensive: allow running without spaCy loaded or on very small devices
     try:
+        nlp = get_nlp()
         q_doc = nlp(query)
         t_doc = nlp(" ".join([name or "", ingredients or "", method or ""]))
         return q_doc.similarity(t_doc)
@@ -339,6 +1235,7 @@ def lexical_hit(query: str, name: str, ingredients: str, method: str) -> bool:
 
     # 4) Lemma overlap if spaCy is available (ignore failures gracefully)
     try:
+        nlp = get_nlp()
         q_lemmas = {t.lemma_.lower() for t in nlp(query) if t.is_alpha}
         t_lemmas = {t.lemma_.lower() for t in nlp(text) if t.is_alpha}
         if q_lemmas and t_lemmas and any(l in t_lemmas for l in q_lemmas):
@@ -346,78 +1243,2460 @@ def lexical_hit(query: str, name: str, ingredients: str, method: str) -> bool:
     except Exception:
         pass
 
-    return False
+    return False
+
+
+# ---------------------------
+# Full-text search (SQLite FTS5)
+# ---------------------------
+# recipes_fts is an external-content index over the recipes table: it stores
+# only the inverted index, and triggers keep it in step with every write path
+# (add_recipe_to_db, update_recipe, delete_recipe and any manual SQL).
+FTS_COLUMNS = ("name", "ingredients", "method", "tags", "notes")
+
+# bm25() weights, one per FTS_COLUMNS entry — a hit in the title matters most.
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 6.0, 1.0)
+
+SEARCH_LIMIT = 200
+
+_SNIPPET_OPEN, _SNIPPET_CLOSE = "\x02", "\x03"
+
+
+def init_search_index(conn, rebuild=False):
+    """Create the recipes_fts table + sync triggers; (re)build it when new."""
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='recipes_fts'")
+    exists = c.fetchone() is not None
+
+    cols = ", ".join(FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{col}" for col in FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{col}" for col in FTS_COLUMNS)
+
+    c.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+            {cols},
+            content='recipes', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+            INSERT INTO recipes_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+            INSERT INTO recipes_fts(recipes_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE ON recipes BEGIN
+            INSERT INTO recipes_fts(recipes_fts, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO recipes_fts(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    """)
+
+    if rebuild or not exists:
+        c.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')")
+        c.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('optimize')")
+    conn.commit()
+
+
+def fts_query(q: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    Every word becomes a quoted prefix term ('chick pea' -> "chick"* "pea"*),
+    so partial typing still matches and FTS syntax characters can't leak in.
+    """
+    return " ".join(f'"{tok}"*' for tok in _tokenize(q))
+
+
+def _highlight(snippet: str) -> Markup:
+    """Escape recipe text, then turn the snippet markers into <mark> tags."""
+    safe = escape(snippet or "")
+    return Markup(str(safe).replace(_SNIPPET_OPEN, "<mark>").replace(_SNIPPET_CLOSE, "</mark>"))
+
+
+def search_recipes_fts(conn, q: str, limit: int = SEARCH_LIMIT, offset: int = 0):
+    """
+    BM25-ranked full-text search.
+    Returns list rows of (id, name, snippet_html), best first.
+    """
+    match = fts_query(q)
+    if not match:
+        return []
+
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT recipes_fts.rowid, recipes_fts.name,
+               snippet(recipes_fts, -1, ?, ?, '…', 12)
+          FROM recipes_fts
+         WHERE recipes_fts MATCH ?
+         ORDER BY bm25(recipes_fts, {", ".join(str(w) for w in FTS_WEIGHTS)})
+         LIMIT ? OFFSET ?
+    """, (_SNIPPET_OPEN, _SNIPPET_CLOSE, match, limit, offset))
+    return [(rid, name, _highlight(snip)) for rid, name, snip in c.fetchall()]
+
+
+@app.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Rebuild the FTS5 search index from the recipes table."""
+    init_db()
+    with get_conn() as conn:
+        init_search_index(conn, rebuild=True)
+        count = conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+    data_version.bump()
+    print(f"✅ Search index rebuilt for {count} recipes.")
+
+
+# ---------------------------
+# Typo-tolerant search (character trigrams)
+# ---------------------------
+# Fallback for when FTS finds nothing ("chiken", "courgete", "lasagna" vs
+# "lasagne"). Every word of every recipe name and parsed ingredient item is
+# a vocabulary term; terms are indexed by their padded character trigrams.
+# A query word is matched against the vocabulary (trigram Jaccard to pick
+# candidates, edit distance to confirm short typos), then recipes are ranked
+# by how well each query word matched their name (full weight) or items.
+# The vocabulary is a few thousand words even for 50k recipes, so a lookup
+# is a couple of NumPy bincounts. The index is rebuilt when the
+# 'recipe_words' counter in sync_state moves. A trigger bumps it when a
+# recipe is renamed; the writers bump it once per added or deleted recipe,
+# once per import batch, and store_recipe_ingredients() once when an edit
+# changes a recipe's item words. Tag, notes, similar-graph and planner
+# writes leave it (and the copy workers share from the master) alone. The
+# rebuild runs in the background once an index exists, serving the old one.
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_CANDIDATES = 64      # terms per query word checked with edit distance
+FUZZY_TERMS = 8            # best matching terms kept per query word
+FUZZY_ITEM_WEIGHT = 0.6    # an ingredient match counts less than a name match
+
+
+_BUMP_RECIPE_WORDS = "UPDATE sync_state SET version = version + 1 WHERE name = 'recipe_words'"
+
+
+def init_recipe_words_version(conn):
+    c = conn.cursor()
+    c.execute("INSERT OR IGNORE INTO sync_state (name, version) VALUES ('recipe_words', 1)")
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS recipes_words_au AFTER UPDATE OF name ON recipes
+        WHEN old.name IS NOT new.name BEGIN {_BUMP_RECIPE_WORDS}; END
+    """)
+    # row triggers fired once per ingredient line of every edit and import
+    for trigger in ("recipes_words_ai", "recipes_words_ad", "recipe_ingredients_words_ai",
+                    "recipe_ingredients_words_ad", "recipe_ingredients_words_au"):
+        c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.commit()
+
+
+def bump_recipe_words(conn):
+    conn.execute(_BUMP_RECIPE_WORDS)
+
+
+def _item_words(items):
+    return {w for item in items for w in _fold(item or "").split()}
+
+
+def recipe_words_version(conn) -> int:
+    row = conn.execute("SELECT version FROM sync_state WHERE name = 'recipe_words'").fetchone()
+    return row[0] if row else 0
+
+
+def _fold(s: str) -> str:
+    """_normalize() with accents folded first ('jalapeño' -> 'jalapeno')."""
+    s = unicodedata.normalize("NFKD", s or "")
+    return _normalize("".join(ch for ch in s if not unicodedata.combining(ch)))
+
+
+def _trigrams(word: str) -> set:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int = 2) -> int:
+    """Levenshtein with adjacent swaps (OSA); returns limit + 1 once past `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], before[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        before, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+class TrigramIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._building = False
+        self._data = None   # everything a search reads, swapped in one assignment
+
+    @staticmethod
+    def _build(conn):
+        ids, names = [], []
+        for rid, name in conn.execute("SELECT id, name FROM recipes ORDER BY id"):
+            ids.append(rid)
+            names.append(name)
+        pos = {rid: i for i, rid in enumerate(ids)}
+        in_name, in_item = {}, {}
+        for i, name in enumerate(names):
+            for w in _fold(name).split():
+                in_name.setdefault(w, set()).add(i)
+        words = {}   # items repeat across recipes; fold each once
+        for rid, item in conn.execute("SELECT DISTINCT recipe_id, item FROM recipe_ingredients"):
+            i = pos.get(rid)
+            if i is None:
+                continue
+            if item not in words:
+                words[item] = _fold(item).split()
+            for w in words[item]:
+                in_item.setdefault(w, set()).add(i)
+
+        terms = sorted(w for w in in_name.keys() | in_item.keys() if len(w) >= 3 and not w.isdigit())
+        grams = {}
+        sizes = np.empty(len(terms), dtype=np.float64)
+        for t, term in enumerate(terms):
+            g = _trigrams(term)
+            sizes[t] = len(g)
+            for gram in g:
+                grams.setdefault(gram, []).append(t)
+
+        def postings(index, term):
+            return np.array(sorted(index.get(term, ())), dtype=np.int64)
+
+        return {
+            "ids": np.array(ids, dtype=np.int64),
+            "names": names,
+            "terms": terms,
+            "sizes": sizes,
+            "grams": {g: np.array(ts, dtype=np.int64) for g, ts in grams.items()},
+            "name_post": [postings(in_name, term) for term in terms],
+            "item_post": [postings(in_item, term) for term in terms],
+        }
+
+    def _rebuild(self, token):
+        data = None
+        conn = connect_db()
+        try:
+            data = self._build(conn)
+        except sqlite3.Error as e:
+            print("⚠️ Trigram index rebuild failed, keeping the old one:", e)
+        finally:
+            conn.close()
+            with self._lock:
+                if data is not None:
+                    self._data, self._token = data, token
+                self._building = False
+
+    def current(self, conn):
+        """The index, rebuilt first when missing, or in the background when stale."""
+        token = recipe_words_version(conn)   # read before building: the data is at least this new
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data, self._token = self._build(conn), token
+        elif token != self._token and not self._building:
+            with self._lock:
+                if token != self._token and not self._building:
+                    self._building = True
+                    threading.Thread(target=self._rebuild, args=(token,),
+                                     name="trigram-index", daemon=True).start()
+        return self._data
+
+    @staticmethod
+    def match_terms(data, word):
+        """[(term index, similarity)] for vocabulary words close to `word`, best first."""
+        g = _trigrams(word)
+        hits = [data["grams"][x] for x in g if x in data["grams"]]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(data["terms"]))
+        cand = np.flatnonzero(shared)
+        jaccard = shared[cand] / (len(g) + data["sizes"][cand] - shared[cand])
+        best = np.argsort(-jaccard, kind="stable")[:FUZZY_CANDIDATES]
+        limit = 1 if len(word) < 8 else 2
+        out = []
+        for k in best:
+            term = data["terms"][cand[k]]
+            d = edit_distance(word, term, limit)
+            sim = max(float(jaccard[k]), 1 - d / max(len(word), len(term)) if d <= limit else 0.0)
+            if sim >= FUZZY_MIN_SIMILARITY:
+                out.append((int(cand[k]), sim))
+        out.sort(key=lambda m: -m[1])
+        return out[:FUZZY_TERMS]
+
+    def search(self, conn, q: str, limit: int = SEARCH_LIMIT):
+        """List rows (id, name, snippet) for a misspelt query; snippet shows what matched."""
+        data = self.current(conn)
+        words = [w for w in _fold(q).split() if len(w) >= 3]
+        if not words or not len(data["ids"]):
+            return []
+        n = len(data["ids"])
+        total = np.zeros(n)
+        matched = np.zeros(n, dtype=np.int64)
+        best_terms = []   # per word: [(term, recipe positions, score)] best first
+        for word in words:
+            acc = np.zeros(n)
+            found = []
+            for t, sim in self.match_terms(data, word):
+                for post, weight in ((data["name_post"][t], 1.0), (data["item_post"][t], FUZZY_ITEM_WEIGHT)):
+                    if len(post):
+                        np.maximum.at(acc, post, sim * weight)
+                        found.append((data["terms"][t], post, sim * weight))
+            total += acc
+            matched += acc > 0
+            best_terms.append(sorted(found, key=lambda f: -f[2]))
+
+        hit = np.flatnonzero(matched)
+        if not len(hit):
+            return []
+        # recipes matching every word first, then by summed similarity
+        order = hit[np.lexsort((hit, -total[hit], -matched[hit]))][:limit]
+        rows = []
+        for i in order:
+            shown = []
+            for found in best_terms:
+                for term, post, _ in found:
+                    j = np.searchsorted(post, i)
+                    if j < len(post) and post[j] == i:
+                        shown.append(term)
+                        break
+            snippet = Markup("≈ ") + Markup(" ").join(Markup("<mark>%s</mark>") % t for t in shown)
+            rows.append((int(data["ids"][i]), data["names"][i], snippet))
+        return rows
+
+
+trigram_index = TrigramIndex()
+
+
+# ---------------------------
+# Semantic search (precomputed recipe vectors)
+# ---------------------------
+# Each recipe's spaCy doc vector is computed once at write time and stored as
+# a unit-length float32 blob in recipe_vectors. Every process keeps all of
+# them in one NumPy matrix, so a query is one nlp() call + one mat-vec product.
+SEMANTIC_TOP_K = 30
+
+
+def recipe_text(name, ingredients, method) -> str:
+    """The text a recipe is embedded from (same fields recipe_score() uses)."""
+    return " ".join([name or "", ingredients or "", method or ""])
+
+
+def _unit_vector(vec):
+    """float32 copy scaled to length 1, or None for an empty/zero vector."""
+    vec = np.asarray(vec, dtype=np.float32)
+    norm = float(np.linalg.norm(vec)) if vec.size else 0.0
+    if norm == 0.0:
+        return None
+    return vec / norm
+
+
+def embed_text(text: str):
+    return _unit_vector(get_nlp()(text).vector)
+
+
+def init_vector_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_vectors (
+            recipe_id INTEGER PRIMARY KEY,
+            dim INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+class RecipeVectorIndex:
+    """
+    In-memory (ids, matrix) view of recipe_vectors.
+    Writes in this process patch single rows; writes from other processes are
+    picked up by a cheap COUNT/MAX(updated_at) stamp check before each search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._pos = {}
+
+    @staticmethod
+    def _db_stamp(conn):
+        return tuple(conn.execute(
+            "SELECT COUNT(*), MAX(updated_at) FROM recipe_vectors"
+        ).fetchone())
+
+    def ensure_loaded(self, conn):
+        stamp = self._db_stamp(conn)
+        if stamp == self._stamp:
+            return
+        rows = conn.execute("SELECT recipe_id, dim, vector FROM recipe_vectors").fetchall()
+        dims = Counter(dim for _, dim, _ in rows)
+        dim = dims.most_common(1)[0][0] if dims else 0
+        rows = [r for r in rows if r[1] == dim]   # skip rows left by an older model
+
+        matrix = np.empty((len(rows), dim), dtype=np.float32)
+        for i, (_, _, blob) in enumerate(rows):
+            matrix[i] = np.frombuffer(blob, dtype=np.float32)
+        with self._lock:
+            self.ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            self.matrix = matrix
+            self._pos = {int(rid): i for i, rid in enumerate(self.ids)}
+            self._stamp = stamp
+
+    def put(self, conn, recipe_id, vec):
+        """Replace (or append) one recipe's row without reloading the rest."""
+        with self._lock:
+            if self._stamp is None:
+                return  # not loaded yet; the first search reads it from the DB
+            if self.matrix.shape[1] != vec.shape[0]:
+                self._stamp = None  # dimension changed: force a full reload
+                return
+            i = self._pos.get(recipe_id)
+            if i is None:
+                self._pos[recipe_id] = len(self.ids)
+                self.ids = np.append(self.ids, np.int64(recipe_id))
+                self.matrix = np.vstack([self.matrix, vec[None, :]])
+            else:
+                self.matrix[i] = vec
+            self._stamp = self._db_stamp(conn)
+
+    def discard(self, conn, recipe_id):
+        with self._lock:
+            i = self._pos.pop(recipe_id, None)
+            if self._stamp is None or i is None:
+                return
+            self.ids = np.delete(self.ids, i)
+            self.matrix = np.delete(self.matrix, i, axis=0)
+            self._pos = {int(rid): j for j, rid in enumerate(self.ids)}
+            self._stamp = self._db_stamp(conn)
+
+    def top_k(self, qvec, k=SEMANTIC_TOP_K):
+        """[(recipe_id, cosine), ...] best first; vectors are pre-normalised."""
+        with self._lock:
+            ids, matrix = self.ids, self.matrix
+        if not len(ids) or matrix.shape[1] != qvec.shape[0]:
+            return []
+        scores = matrix @ qvec
+        k = min(k, len(ids))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+
+recipe_vectors = RecipeVectorIndex()
+
+
+def store_recipe_vector(conn, recipe_id, name, ingredients, method):
+    """Recompute one recipe's vector (write-time hook for add/update)."""
+    try:
+        vec = embed_text(recipe_text(name, ingredients, method))
+    except Exception as e:
+        print(f"⚠️ Could not embed recipe {recipe_id}: {e}")
+        return
+    if vec is None:
+        drop_recipe_vector(conn, recipe_id)
+        return
+    conn.execute("""
+        INSERT INTO recipe_vectors (recipe_id, dim, vector, updated_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(recipe_id) DO UPDATE SET
+            dim = excluded.dim,
+            vector = excluded.vector,
+            updated_at = excluded.updated_at
+    """, (recipe_id, int(vec.shape[0]), vec.tobytes(), time.time()))
+    recipe_vectors.put(conn, recipe_id, vec)
+
+
+def drop_recipe_vector(conn, recipe_id):
+    conn.execute("DELETE FROM recipe_vectors WHERE recipe_id = ?", (recipe_id,))
+    recipe_vectors.discard(conn, recipe_id)
+
+
+def search_recipes_semantic(conn, q: str, k: int = SEMANTIC_TOP_K):
+    """List rows of (id, name, None) ordered by cosine similarity."""
+    try:
+        qvec = embed_text(q)
+    except Exception as e:
+        # no model: empty result, so callers fall back to keyword search
+        print(f"⚠️ Semantic search unavailable: {e}")
+        return []
+    if qvec is None:
+        return []
+    recipe_vectors.ensure_loaded(conn)
+    hits = recipe_vectors.top_k(qvec, k)
+    if not hits:
+        return []
+
+    ids = [rid for rid, _ in hits]
+    c = conn.cursor()
+    c.execute(
+        f"SELECT id, name, NULL FROM recipes WHERE id IN ({','.join(['?'] * len(ids))})",
+        ids,
+    )
+    by_id = {r[0]: tuple(r) for r in c.fetchall()}
+    return [by_id[rid] for rid in ids if rid in by_id]
+
+
+@app.cli.command("rebuild-vectors")
+def rebuild_vectors_command():
+    """Recompute every recipe vector (after a spaCy model change, or first run)."""
+    init_db()
+    with get_conn() as conn:
+        rows = conn.execute("SELECT id, name, ingredients, method FROM recipes").fetchall()
+        texts = (recipe_text(name, ing, method) for _, name, ing, method in rows)
+        conn.execute("DELETE FROM recipe_vectors")
+        now = time.time()
+        stored = 0
+        for (rid, *_), doc in zip(rows, get_nlp().pipe(texts, batch_size=64)):
+            vec = _unit_vector(doc.vector)
+            if vec is None:
+                continue
+            conn.execute(
+                "INSERT INTO recipe_vectors (recipe_id, dim, vector, updated_at) VALUES (?, ?, ?, ?)",
+                (rid, int(vec.shape[0]), vec.tobytes(), now),
+            )
+            stored += 1
+        conn.commit()
+    data_version.bump()
+    print(f"✅ Stored vectors for {stored} of {len(rows)} recipes.")
+
+
+# Common normalizations / synonyms
+TAG_SYNONYMS = {
+    "soups": "soup",
+    "salads": "salad",
+    "fish & seafood": "seafood",
+    "seafood & fish": "seafood",
+    "pasta dishes": "pasta",
+    "curries": "curry",
+    "desserts": "dessert",
+    "cakes": "cake",
+    "cookies": "cookie",
+    "breads": "bread",
+}
+
+
+def split_raw_tags(raw):
+    """Split a stored tags value (JSON list, quoted list or comma text) into strings."""
+    if not raw:
+        return []
+
+    # --- Try JSON decode first ---
+    if raw.strip().startswith("["):
+        try:
+            decoded = json.loads(raw)
+            if isinstance(decoded, list):
+                return [str(t) for t in decoded]
+            elif isinstance(decoded, str):
+                return [decoded]
+            return []
+        except Exception:
+            cleaned = raw.strip("[]'\" ")
+            return re.split(r"[,;]", cleaned)
+    return re.split(r"[,;]", raw)
+
+
+def normalize_tag(t):
+    """Clean one tag: strip punctuation, lowercase, singularize, apply synonyms."""
+    t = re.sub(r'[^a-zA-Z0-9 &-]', '', t or "").strip().lower()
+    if not t:
+        return ""
+    # synonyms are keyed by the plural form, so check before singularizing too
+    if t in TAG_SYNONYMS:
+        return TAG_SYNONYMS[t]
+    # singularize simple plurals (quick heuristic)
+    if t.endswith("s") and len(t) > 3:
+        t = t[:-1]
+    return TAG_SYNONYMS.get(t, t)
+
+
+def normalize_tags(raw):
+    """Distinct normalized tags for one recipe, in their original order."""
+    return list(dict.fromkeys(t for t in map(normalize_tag, split_raw_tags(raw)) if t))
+
+
+def init_tags_table(conn):
+    """Create the materialized recipe_tags index; backfill it when new."""
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='recipe_tags'")
+    exists = c.fetchone() is not None
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_tags (
+            recipe_id INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (recipe_id, tag)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recipe_tags_tag ON recipe_tags(tag, recipe_id)")
+    if not exists:
+        rebuild_recipe_tags(conn)
+    conn.commit()
+
+
+def store_recipe_tags(conn, recipe_id, raw_tags):
+    """Replace one recipe's rows in recipe_tags (write-time hook for add/update)."""
+    conn.execute("DELETE FROM recipe_tags WHERE recipe_id = ?", (recipe_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO recipe_tags (recipe_id, tag) VALUES (?, ?)",
+        [(recipe_id, t) for t in normalize_tags(raw_tags)],
+    )
+
+
+def rebuild_recipe_tags(conn):
+    """Backfill recipe_tags from the raw recipes.tags column."""
+    rows = conn.execute("SELECT id, tags FROM recipes").fetchall()
+    conn.execute("DELETE FROM recipe_tags")
+    conn.executemany(
+        "INSERT OR IGNORE INTO recipe_tags (recipe_id, tag) VALUES (?, ?)",
+        [(rid, t) for rid, raw in rows for t in normalize_tags(raw)],
+    )
+    return len(rows)
+
+
+def get_tag_cloud(conn=None):
+    """Return a sorted list of (tag, recipe count) from the recipe_tags index."""
+    if conn is None:
+        with get_conn() as conn:
+            return get_tag_cloud(conn)
+    c = conn.cursor()
+    c.execute("SELECT tag, COUNT(*) FROM recipe_tags GROUP BY tag ORDER BY tag")
+    return c.fetchall()
+
+
+def recipes_with_tag(conn, tag, after=None, limit=-1):
+    """
+    Indexed exact lookup: list rows of (id, name, None) for one tag in
+    (name, id) order, starting after the `after` = (name, id) key.
+    """
+    name, rid = after or ("", 0)
+    c = conn.cursor()
+    c.execute("""
+        SELECT r.id, r.name, NULL
+          FROM recipe_tags t
+          JOIN recipes r ON r.id = t.recipe_id
+         WHERE t.tag = ? AND (r.name, r.id) > (?, ?)
+         ORDER BY r.name, r.id
+         LIMIT ?
+    """, (normalize_tag(tag), name, rid, limit))
+    return c.fetchall()
+
+
+@app.cli.command("rebuild-tags")
+def rebuild_tags_command():
+    """Re-derive recipe_tags from recipes.tags (after changing TAG_SYNONYMS)."""
+    init_db()
+    with get_conn() as conn:
+        count = rebuild_recipe_tags(conn)
+        conn.commit()
+    data_version.bump()
+    print(f"✅ Tag index rebuilt for {count} recipes.")
+
+
+# ---------------------------
+# Similar recipes (precomputed neighbour graph)
+# ---------------------------
+#   flask --app app rebuild-similar
+# Each recipe keeps its SIMILAR_K nearest neighbours in recipe_similar, so
+# the detail page reads them with one indexed lookup. Similarity is Jaccard
+# overlap of canonical ingredient items, blended with tag overlap. Items and
+# tags on more than SIMILAR_STOP_FRAC of recipes (salt, oil, "dinner") are
+# ignored; they say nothing about a dish and make every recipe a candidate.
+# Triggers on recipe_ingredients / recipe_tags / recipes queue changed ids
+# in recipe_similar_dirty (same transaction as the edit, from any process).
+# One drainer empties that queue, so the index lives in memory once: every
+# gunicorn worker (and the development server) runs a drain thread, but only
+# the one holding the 'similar' row in worker_leases does any work; the
+# others check every SIMILAR_POLL_S whether it has lapsed (holder recycled or
+# killed) and take over. The holder recomputes the changed recipes, every recipe that listed one of
+# them, and every recipe one of them now beats the weakest neighbour of,
+# then touches SIMILAR_STAMP_PATH, which only recipe pages are cached by.
+SIMILAR_K = 6
+SIMILAR_MIN_SCORE = 0.08
+SIMILAR_TAG_WEIGHT = 0.3
+SIMILAR_STOP_FRAC = 0.2
+SIMILAR_STOP_MIN = 25          # small collections: nothing is a stop item
+SIMILAR_FULL_FRAC = 0.1        # this much of the corpus dirty -> full rebuild
+SIMILAR_POLL_S = 2             # an empty-queue check; edits come from other processes
+SIMILAR_LEASE_S = 120          # renewed at half-time; outlasts a full rebuild
+SIMILAR_STAMP_PATH = Path(DB_PATH + ".similar")
+
+
+def init_similar_table(conn):
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='recipe_similar'")
+    exists = c.fetchone() is not None
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_similar (
+            recipe_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            similar_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (recipe_id, rank)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_recipe_similar_similar ON recipe_similar(similar_id)")
+    # REPLACE gives a re-queued id a new seq, so a drain that read the queue
+    # earlier can't delete an edit it hasn't seen
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_similar_dirty (
+            seq INTEGER PRIMARY KEY,
+            recipe_id INTEGER NOT NULL UNIQUE
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS worker_leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires REAL NOT NULL
+        )
+    """)
+    for table, event, row in (("recipe_ingredients", "INSERT", "new"), ("recipe_ingredients", "DELETE", "old"),
+                              ("recipe_tags", "INSERT", "new"), ("recipe_tags", "DELETE", "old"),
+                              ("recipes", "DELETE", "old")):
+        rid = "old.id" if table == "recipes" else f"{row}.recipe_id"
+        c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_similar_{event.lower()}
+            AFTER {event} ON {table} BEGIN
+                INSERT OR REPLACE INTO recipe_similar_dirty (recipe_id) VALUES ({rid});
+            END
+        """)
+    if not exists:
+        # built by the drainer on its first pass (or run rebuild-similar)
+        c.execute("INSERT OR REPLACE INTO recipe_similar_dirty (recipe_id) SELECT id FROM recipes")
+    conn.commit()
+
+
+class SimilarityIndex:
+    """Feature sets + inverted postings for every recipe, held by the drain thread."""
+
+    def __init__(self):
+        self.ing = {}     # recipe_id -> frozenset of canonical items
+        self.tags = {}    # recipe_id -> frozenset of tags
+        self.post_ing = {}
+        self.post_tag = {}
+        self.stop = frozenset()        # too-common items
+        self.stop_tags = frozenset()
+        self.version = None
+
+    @staticmethod
+    def _fetch(conn, ids=None):
+        where, args = "", ()
+        if ids is not None:
+            where = f"WHERE recipe_id IN ({','.join('?' * len(ids))})"
+            args = tuple(ids)
+        ing, tags, canonical = {}, {}, {}
+        for rid, item in conn.execute(f"SELECT recipe_id, item FROM recipe_ingredients {where}", args):
+            key = canonical.get(item)
+            if key is None:
+                key = canonical[item] = canonical_item(item)
+            if key:
+                ing.setdefault(rid, set()).add(key)
+        for rid, tag in conn.execute(f"SELECT recipe_id, tag FROM recipe_tags {where}", args):
+            tags.setdefault(rid, set()).add(tag)
+        return ing, tags
+
+    def load(self, conn):
+        ing, tags = self._fetch(conn)
+        ids = [r[0] for r in conn.execute("SELECT id FROM recipes")]
+        cutoff = max(SIMILAR_STOP_MIN, SIMILAR_STOP_FRAC * len(ids))
+        for attr, sets in (("stop", ing), ("stop_tags", tags)):
+            df = Counter(f for fs in sets.values() for f in fs)
+            setattr(self, attr, frozenset(f for f, n in df.items() if n > cutoff))
+        self.ing, self.tags, self.post_ing, self.post_tag = {}, {}, {}, {}
+        for rid in ids:
+            self._add(rid, ing.get(rid, ()), tags.get(rid, ()))
+
+    def _add(self, rid, ing, tags):
+        self.ing[rid] = frozenset(ing) - self.stop
+        self.tags[rid] = frozenset(tags) - self.stop_tags
+        for f in self.ing[rid]:
+            self.post_ing.setdefault(f, set()).add(rid)
+        for t in self.tags[rid]:
+            self.post_tag.setdefault(t, set()).add(rid)
+
+    def _remove(self, rid):
+        for f in self.ing.pop(rid, ()):
+            self.post_ing[f].discard(rid)
+        for t in self.tags.pop(rid, ()):
+            self.post_tag[t].discard(rid)
+
+    def patch(self, conn, ids):
+        """Reload the features of `ids` (dropping recipes that no longer exist)."""
+        ids = list(ids)
+        ing, tags = self._fetch(conn, ids)
+        alive = {r[0] for r in conn.execute(
+            f"SELECT id FROM recipes WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        for rid in ids:
+            self._remove(rid)
+            if rid in alive:
+                self._add(rid, ing.get(rid, ()), tags.get(rid, ()))
+
+    def scores(self, rid):
+        """{other_id: score} for every recipe sharing an item or tag with `rid`."""
+        ing, tags = self.ing.get(rid, frozenset()), self.tags.get(rid, frozenset())
+        shared_ing = Counter(o for f in ing for o in self.post_ing.get(f, ()))
+        shared_tag = Counter(o for t in tags for o in self.post_tag.get(t, ()))
+        out = {}
+        for o in shared_ing.keys() | shared_tag.keys():
+            if o == rid:
+                continue
+            ci, ct = shared_ing[o], shared_tag[o]
+            ji = ci / (len(ing) + len(self.ing[o]) - ci) if ci else 0.0
+            jt = ct / (len(tags) + len(self.tags[o]) - ct) if ct else 0.0
+            score = (1 - SIMILAR_TAG_WEIGHT) * ji + SIMILAR_TAG_WEIGHT * jt
+            if score >= SIMILAR_MIN_SCORE:
+                out[o] = score
+        return out
+
+    def neighbours(self, rid, scores=None):
+        scores = self.scores(rid) if scores is None else scores
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:SIMILAR_K]
+        return [(rid, rank, o, round(s, 4)) for rank, (o, s) in enumerate(best)]
+
+    def all_neighbours(self):
+        """neighbours() for every recipe at once: same scores, numpy counting."""
+        ids = np.fromiter(self.ing, dtype=np.int64, count=len(self.ing))
+        pos = {int(r): i for i, r in enumerate(ids)}
+        n = len(ids)
+        empty = np.empty(0, dtype=np.int64)
+
+        def arrays(features, postings):
+            sizes = np.fromiter((len(features[r]) for r in self.ing), dtype=np.float64, count=n)
+            post = {f: np.fromiter((pos[o] for o in members), dtype=np.int64, count=len(members))
+                    for f, members in postings.items()}
+            return sizes, post
+
+        n_ing, post_ing = arrays(self.ing, self.post_ing)
+        n_tag, post_tag = arrays(self.tags, self.post_tag)
+        rows = []
+        for i, rid in enumerate(self.ing):
+            ci = np.bincount(np.concatenate([post_ing[f] for f in self.ing[rid]] or [empty]), minlength=n)
+            ct = np.bincount(np.concatenate([post_tag[t] for t in self.tags[rid]] or [empty]), minlength=n)
+            ci[i] = ct[i] = 0
+            cand = np.flatnonzero(ci + ct)
+            if not len(cand):
+                continue
+            a, b = ci[cand], ct[cand]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ji = np.where(a > 0, a / (n_ing[i] + n_ing[cand] - a), 0.0)
+                jt = np.where(b > 0, b / (n_tag[i] + n_tag[cand] - b), 0.0)
+            score = (1 - SIMILAR_TAG_WEIGHT) * ji + SIMILAR_TAG_WEIGHT * jt
+            keep = score >= SIMILAR_MIN_SCORE
+            cand, score = ids[cand[keep]], score[keep]
+            best = np.lexsort((cand, -score))[:SIMILAR_K]
+            rows += [(rid, rank, int(cand[j]), round(float(score[j]), 4)) for rank, j in enumerate(best)]
+        return rows
+
+
+def _write_neighbours(conn, ids, rows):
+    ids = list(ids)
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        conn.execute(f"DELETE FROM recipe_similar WHERE recipe_id IN ({','.join('?' * len(chunk))})", chunk)
+    conn.executemany(
+        "INSERT INTO recipe_similar (recipe_id, rank, similar_id, score) VALUES (?, ?, ?, ?)", rows)
+
+
+def _bump_similar_version(conn):
+    conn.execute("""
+        INSERT INTO sync_state (name, version) VALUES ('recipe_similar', 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """)
+    return conn.execute("SELECT version FROM sync_state WHERE name = 'recipe_similar'").fetchone()[0]
+
+
+def rebuild_similar(conn, index=None):
+    """Recompute the whole graph. Returns the number of recipes written."""
+    index = index or SimilarityIndex()
+    conn.execute("BEGIN")   # one snapshot for the queue position and the features
+    try:
+        seen = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM recipe_similar_dirty").fetchone()[0]
+        index.load(conn)
+    finally:
+        conn.commit()
+    rows = index.all_neighbours()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM recipe_similar")
+        _write_neighbours(conn, [], rows)
+        # edits made while we computed stay queued for update_similar()
+        conn.execute("DELETE FROM recipe_similar_dirty WHERE seq <= ?", (seen,))
+        version = _bump_similar_version(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    # anything queued meanwhile was computed from newer rows than index holds
+    index.version = version if seen == conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM recipe_similar_dirty").fetchone()[0] else None
+    return len(index.ing)
+
+
+def update_similar(conn, index):
+    """Drain recipe_similar_dirty, touching only affected neighbour lists. Returns recipes rewritten."""
+    pending = conn.execute("SELECT COUNT(*) FROM recipe_similar_dirty").fetchone()[0]
+    if not pending:
+        return 0
+    version_sql = "SELECT version FROM sync_state WHERE name = 'recipe_similar'"
+    total = conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+    built = conn.execute(version_sql).fetchone()
+    if built is None or pending > max(SIMILAR_K, SIMILAR_FULL_FRAC * total):
+        return rebuild_similar(conn, index)
+
+    if index.version != built[0]:
+        # first drain in this process, or another one drained since: reload
+        # outside the write lock (the features read are at least that new)
+        conn.execute("BEGIN")
+        try:
+            index.load(conn)
+            index.version = conn.execute(version_sql).fetchone()[0]
+        finally:
+            conn.commit()
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        dirty = [r[0] for r in conn.execute("SELECT recipe_id FROM recipe_similar_dirty")]
+        if not dirty:   # another process got here first
+            conn.commit()
+            return 0
+        if conn.execute(version_sql).fetchone()[0] != index.version:
+            index.load(conn)
+        else:
+            index.patch(conn, dirty)
+
+        marks = ",".join("?" * len(dirty))
+        affected = {r[0] for r in conn.execute(
+            f"SELECT DISTINCT recipe_id FROM recipe_similar WHERE similar_id IN ({marks})", dirty)}
+        rows, candidates = [], {}
+        for rid in dirty:
+            if rid in index.ing:
+                scores = index.scores(rid)
+                rows += index.neighbours(rid, scores)
+                for o, s in scores.items():
+                    candidates[o] = max(s, candidates.get(o, 0.0))
+        # symmetric scores: a changed recipe may now beat o's weakest neighbour
+        ids = [o for o in candidates if o not in affected]
+        weakest = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            weakest.update((r[0], (r[1], r[2])) for r in conn.execute(
+                f"SELECT recipe_id, COUNT(*), MIN(score) FROM recipe_similar "
+                f"WHERE recipe_id IN ({','.join('?' * len(chunk))}) GROUP BY recipe_id", chunk))
+        for o in ids:
+            n, low = weakest.get(o, (0, 0.0))
+            if n < SIMILAR_K or candidates[o] > low:
+                affected.add(o)
+        affected -= set(dirty)
+        affected &= index.ing.keys()
+        for rid in affected:
+            rows += index.neighbours(rid)
+
+        _write_neighbours(conn, set(dirty) | affected, rows)
+        conn.execute(f"DELETE FROM recipe_similar_dirty WHERE recipe_id IN ({marks})", dirty)
+        index.version = _bump_similar_version(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(dirty) + len(affected)
+
+
+def take_lease(conn, name, holder, ttl):
+    """Take or renew lease `name` for `ttl` seconds; False while someone else holds it."""
+    now = time.time()
+    cur = conn.execute("""
+        INSERT INTO worker_leases (name, holder, expires) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires = excluded.expires
+         WHERE worker_leases.holder = excluded.holder OR worker_leases.expires < ?
+    """, (name, holder, now + ttl, now))
+    conn.commit()
+    return cur.rowcount == 1
+
+
+class SimilarityWorker:
+    """
+    Drains recipe_similar_dirty while holding the 'similar' lease.
+    start_thread() is called per gunicorn worker (after_fork) and by the
+    development server. Nothing starts it on import, so tests, the bench and
+    CLI commands never drain.
+    """
+
+    def __init__(self, interval=SIMILAR_POLL_S):
+        self.interval = interval
+        self.index = SimilarityIndex()
+        self.stopping = False
+        self._event = threading.Event()
+        self._holder = None
+        self._lease_until = 0.0
+
+    def start_thread(self):
+        self._holder = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self.stopping = False
+        threading.Thread(target=self.run, name="similar-recipes", daemon=True).start()
+
+    def kick(self):
+        """Drain now (only reaches a drainer in this process; others poll)."""
+        self._event.set()
+
+    def stop(self):
+        """Stop draining and hand the lease on (gunicorn worker_exit)."""
+        self.stopping = True
+        self._event.set()
+        if self._lease_until:
+            conn = connect_db()
+            try:
+                conn.execute("DELETE FROM worker_leases WHERE name = 'similar' AND holder = ?",
+                             (self._holder,))
+                conn.commit()
+            finally:
+                conn.close()
+            self._lease_until = 0.0
+
+    def _holds_lease(self, conn):
+        now = time.time()
+        if self._lease_until - now > SIMILAR_LEASE_S / 2:
+            return True
+        row = conn.execute("SELECT holder, expires FROM worker_leases WHERE name = 'similar'").fetchone()
+        if row is None or row[0] == self._holder or row[1] < now:
+            if take_lease(conn, "similar", self._holder, SIMILAR_LEASE_S):
+                self._lease_until = now + SIMILAR_LEASE_S
+                return True
+        if self._lease_until:
+            self._lease_until = 0.0
+            self.index = SimilarityIndex()   # someone else drains now: free ours
+        return False
+
+    def run(self):
+        conn = connect_db()
+        while not self.stopping:
+            try:
+                if self._holds_lease(conn):
+                    t0 = time.perf_counter()
+                    n = update_similar(conn, self.index)
+                    if n:
+                        app.logger.info("similar recipes: %d lists updated in %.2fs", n, time.perf_counter() - t0)
+                        similar_stamp.touch()
+            except sqlite3.Error as e:
+                print("⚠️ similar recipes:", e)
+            self._event.wait(self.interval)
+            self._event.clear()
+        conn.close()
+
+
+similar_stamp = StampFile(SIMILAR_STAMP_PATH)
+similar_worker = SimilarityWorker()
+
+
+def similar_recipes(conn, recipe_id):
+    """[(id, name, score)] from the precomputed graph, best first."""
+    return conn.execute("""
+        SELECT s.similar_id, r.name, s.score
+          FROM recipe_similar s JOIN recipes r ON r.id = s.similar_id
+         WHERE s.recipe_id = ?
+         ORDER BY s.rank
+    """, (recipe_id,)).fetchall()
+
+
+@app.cli.command("rebuild-similar")
+def rebuild_similar_command():
+    """Recompute the similar-recipes graph from scratch."""
+    t0 = time.perf_counter()
+    n = rebuild_similar(get_conn())
+    similar_stamp.touch()
+    print(f"🔗 Similar recipes rebuilt for {n} recipes in {time.perf_counter() - t0:.2f}s")
+
+
+# ---------------------------
+# Bulk recipe import
+# ---------------------------
+#   flask --app app import-recipes notebooks.ndjson [--images scans.zip]
+#   POST /api/import  (multipart: file, optional images archive)
+# Records stream through read → validate/normalize → batch. Each batch is one
+# transaction: recipes inserted with explicit ids (so executemany works and
+# the derived rows know their recipe), their recipe_tags and
+# recipe_ingredients rows, and the checkpoint for that source — all in the
+# same commit. Running the same file again resumes after the last committed
+# record. FTS rows come from the triggers; vectors are left to
+# `rebuild-vectors`, which batches the spaCy work.
+IMPORT_BATCH = 500
+IMPORT_READ_CHUNK = 64 * 1024
+IMPORT_MAX_ERRORS = 20
+IMAGE_DIR = Path(__file__).with_name("static") / "images"
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+
+def init_import_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            records_done INTEGER NOT NULL DEFAULT 0,
+            inserted INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            invalid INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def import_fingerprint(f):
+    """Size + hash of the first 64 KB of a seekable binary file (rewound after)."""
+    head = f.read(IMPORT_READ_CHUNK)
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    return f"{size}:{hashlib.sha256(head).hexdigest()[:16]}"
+
+
+def detect_import_format(filename, f):
+    """'ndjson', 'csv' or 'json' (array) from the extension, else the first byte."""
+    ext = Path(filename or "").suffix.lower()
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if ext == ".csv":
+        return "csv"
+    head = f.read(512)
+    f.seek(0)
+    first = head.lstrip(b"\xef\xbb\xbf \t\r\n")[:1]
+    return "json" if first == b"[" else "ndjson" if first == b"{" else "csv"
+
+
+def _iter_json_array(f):
+    """Yield the elements of a top-level JSON array, reading it in chunks."""
+    decoder = json.JSONDecoder()
+    buf, pos, started, eof = "", 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a bare number at the end of the buffer might continue in the next chunk
+                if end < len(buf) or eof:
+                    yield obj
+                    pos = end
+                    continue
+        if eof:
+            raise ValueError("unterminated JSON array")
+        chunk = f.read(IMPORT_READ_CHUNK)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+
+def iter_import_records(f, fmt):
+    """Yield (record, error) pairs from a text stream; one of the two is None."""
+    if fmt == "csv":
+        for row in csv.DictReader(f):
+            yield row, None
+    elif fmt == "json":
+        for obj in _iter_json_array(f):
+            yield obj, None
+    else:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, f"line {n}: {e}"
+
+
+def _text_field(value, joiner="\n"):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return joiner.join(str(v).strip() for v in value if str(v).strip())
+    return str(value).strip()
+
+
+def clean_import_record(rec, images=None):
+    """Validate one record → (column dict, normalized tags). ValueError if unusable."""
+    if not isinstance(rec, dict):
+        raise ValueError("record is not an object")
+    rec = {str(k).strip().lower(): v for k, v in rec.items() if k is not None}
+    name = _text_field(rec.get("name") or rec.get("title"), " ")
+    if not name:
+        raise ValueError("missing name")
+
+    ingredients = rec.get("ingredients") or ""
+    if isinstance(ingredients, list):
+        # stored like the existing rows: a JSON list of lines
+        ingredients = json.dumps([str(i).strip() for i in ingredients if str(i).strip()])
+    elif not isinstance(ingredients, str):
+        raise ValueError("ingredients must be text or a list")
+
+    raw_tags = rec.get("tags") or ""
+    tags = normalize_tags(json.dumps(raw_tags) if isinstance(raw_tags, list) else str(raw_tags))
+
+    image_url = _text_field(rec.get("image_url"))
+    image = _text_field(rec.get("image"))
+    if image:
+        stored = (images or {}).get(_archive_key(image))
+        if stored is None and (IMAGE_DIR / secure_filename(Path(image).name)).is_file():
+            stored = secure_filename(Path(image).name)   # already in static/images
+        if stored:
+            image_url = f"/static/images/{stored}"
+
+    return {
+        "name": name,
+        "ingredients": ingredients,
+        "method": _text_field(rec.get("method") or rec.get("instructions")),
+        "tags": json.dumps(tags),
+        "image_url": image_url or None,
+        "notes": _text_field(rec.get("notes")),
+        "category": _text_field(rec.get("category")) or None,
+        "source": _text_field(rec.get("source")) or None,
+    }, tags
+
+
+def _archive_key(name):
+    """'./2019\\IMG_1.jpg' -> '2019/IMG_1.jpg': how records and members are matched."""
+    return posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+
+
+def extract_image_archive(f, filename):
+    """
+    Unpack image files from a .zip or .tar(.gz) into static/images.
+    Each is stored under its content hash, so members that share a file name
+    (2019/IMG_0001.jpg, 2020/IMG_0001.jpg) and images already there are never
+    overwritten. Returns {member path: stored name}, plus the bare file name
+    for names only one member had.
+    """
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+    stored = {}
+
+    def save(member_name, src):
+        ext = Path(member_name).suffix.lower()
+        if ext not in IMAGE_EXTENSIONS:
+            return
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=IMAGE_DIR, suffix=".part", delete=False) as out:
+            try:
+                while chunk := src.read(IMPORT_READ_CHUNK):
+                    digest.update(chunk)
+                    out.write(chunk)
+            except BaseException:
+                os.unlink(out.name)
+                raise
+        name = digest.hexdigest()[:32] + (".jpg" if ext == ".jpeg" else ext)
+        if (IMAGE_DIR / name).exists():
+            os.unlink(out.name)   # same bytes already imported
+        else:
+            os.replace(out.name, IMAGE_DIR / name)
+        stored[_archive_key(member_name)] = name
+
+    if (filename or "").lower().endswith(".zip"):
+        with zipfile.ZipFile(f) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as src:
+                        save(info.filename, src)
+    else:
+        with tarfile.open(fileobj=f, mode="r|*") as tf:   # streaming: no seeking back
+            for member in tf:
+                if member.isfile():
+                    save(member.name, tf.extractfile(member))
+
+    by_base = {}
+    for key, name in stored.items():
+        by_base.setdefault(posixpath.basename(key), set()).add(name)
+    for base, names in by_base.items():
+        if len(names) == 1:
+            stored.setdefault(base, names.pop())
+    return stored
+
+
+def insert_recipe_batch(conn, batch):
+    """
+    executemany-insert cleaned records [(columns, tags), ...] plus their
+    derived rows; returns the new ids. Caller owns the transaction (hold
+    the write lock — ids are assigned from MAX(id)).
+    """
+    c = conn.cursor()
+    next_id = (c.execute("SELECT MAX(id) FROM recipes").fetchone()[0] or 0) + 1
+    ids, recipes, tag_rows, ingredient_rows = [], [], [], []
+    for rid, (rec, tags) in enumerate(batch, next_id):
+        ids.append(rid)
+        recipes.append((rid, rec["name"], rec["ingredients"], rec["method"], rec["tags"],
+                        rec["image_url"], rec["notes"], rec["category"], rec["source"]))
+        tag_rows.extend((rid, t) for t in tags)
+        ingredient_rows.extend(_ingredient_rows(rid, rec["ingredients"]))
+    c.executemany("""
+        INSERT INTO recipes (id, name, ingredients, method, tags, image_url, notes, category, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, recipes)
+    c.executemany("INSERT OR IGNORE INTO recipe_tags (recipe_id, tag) VALUES (?, ?)", tag_rows)
+    c.executemany(_INSERT_INGREDIENT, ingredient_rows)
+    bump_recipe_words(conn)
+    return ids
+
+
+def _write_import_batch(conn, batch, checkpoint):
+    """Insert one batch and advance the checkpoint in a single transaction."""
+    c = conn.cursor()
+    if not conn.in_transaction:
+        c.execute("BEGIN IMMEDIATE")
+    try:
+        insert_recipe_batch(conn, batch)
+        c.execute("""
+            INSERT INTO import_checkpoints
+                (source, fingerprint, records_done, inserted, skipped, invalid, updated_at)
+            VALUES (:source, :fingerprint, :records, :inserted, :skipped, :invalid, :now)
+            ON CONFLICT(source) DO UPDATE SET
+                fingerprint = excluded.fingerprint,
+                records_done = excluded.records_done,
+                inserted = excluded.inserted,
+                skipped = excluded.skipped,
+                invalid = excluded.invalid,
+                updated_at = excluded.updated_at
+        """, {**checkpoint, "now": time.time()})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def import_recipes(conn, f, fmt, source, fingerprint, images=None, skip_existing=True,
+                   restart=False, batch_size=IMPORT_BATCH):
+    """
+    Stream recipes from text stream `f` into the database.
+    A generator: yields a progress dict after every committed batch, the
+    last one with "done": True. Records already committed under the same
+    source + fingerprint are skipped (resume).
+    """
+    t0 = time.perf_counter()
+    row = conn.execute(
+        "SELECT fingerprint, records_done, inserted, skipped, invalid FROM import_checkpoints WHERE source = ?",
+        (source,),
+    ).fetchone()
+    resume_from = 0
+    stats = {"source": source, "records": 0, "inserted": 0, "skipped": 0,
+             "invalid": 0, "errors": [], "done": False}
+    if row and row["fingerprint"] == fingerprint and not restart:
+        resume_from = row["records_done"]
+        stats.update(inserted=row["inserted"], skipped=row["skipped"], invalid=row["invalid"],
+                     resumed_at=resume_from)
+
+    seen = set()
+    if skip_existing:
+        seen = {r[0].lower() for r in conn.execute("SELECT name FROM recipes WHERE name IS NOT NULL")}
+
+    def progress():
+        elapsed = time.perf_counter() - t0
+        done = stats["records"] - resume_from
+        return {**stats, "elapsed_s": round(elapsed, 2),
+                "records_per_s": round(done / elapsed, 1) if elapsed else None}
+
+    def flush(batch):
+        _write_import_batch(conn, batch, {
+            "source": source, "fingerprint": fingerprint, "records": stats["records"],
+            "inserted": stats["inserted"], "skipped": stats["skipped"], "invalid": stats["invalid"],
+        })
+
+    batch = []
+    for rec, error in iter_import_records(f, fmt):
+        stats["records"] += 1
+        if stats["records"] <= resume_from:
+            continue
+        try:
+            if error:
+                raise ValueError(error)
+            cleaned, tags = clean_import_record(rec, images)
+        except ValueError as e:
+            stats["invalid"] += 1
+            if len(stats["errors"]) < IMPORT_MAX_ERRORS:
+                stats["errors"].append({"record": stats["records"], "error": str(e)})
+            continue
+        key = cleaned["name"].lower()
+        if key in seen:
+            stats["skipped"] += 1
+            continue
+        seen.add(key)
+        batch.append((cleaned, tags))
+        stats["inserted"] += 1
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            yield progress()
+
+    flush(batch)   # also records the final position when the last batch was empty
+    if stats["inserted"]:
+        data_version.bump()
+    stats["done"] = True
+    yield progress()
+
+
+@app.cli.command("import-recipes")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--images", type=click.Path(exists=True, dir_okay=False), help=".zip/.tar.gz of recipe images")
+@click.option("--format", "fmt", type=click.Choice(["ndjson", "csv", "json"]), help="default: from the file")
+@click.option("--restart", is_flag=True, help="ignore the checkpoint and start from the top")
+@click.option("--allow-duplicates", is_flag=True, help="also import names that already exist")
+@click.option("--batch-size", default=IMPORT_BATCH, show_default=True)
+def import_recipes_command(path, images, fmt, restart, allow_duplicates, batch_size):
+    """Stream recipes from an NDJSON, CSV or JSON-array file."""
+    init_db()
+    image_names = {}
+    if images:
+        with open(images, "rb") as f:
+            image_names = extract_image_archive(f, images)
+        print(f"🖼️ {len(set(image_names.values()))} images unpacked to {IMAGE_DIR}")
+
+    with open(path, "rb") as raw:
+        fingerprint = import_fingerprint(raw)
+        fmt = fmt or detect_import_format(path, raw)
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        conn = get_conn()
+        announced = False
+        for p in import_recipes(conn, text, fmt, os.path.abspath(path), fingerprint, image_names,
+                                skip_existing=not allow_duplicates, restart=restart,
+                                batch_size=batch_size):
+            if p.get("resumed_at") and not announced:
+                print(f"↪️ Resuming after record {p['resumed_at']}")
+            announced = True
+            print(f"📥 {p['records']} read · {p['inserted']} imported · {p['skipped']} duplicates · "
+                  f"{p['invalid']} invalid · {p['records_per_s'] or 0:.0f} rec/s")
+    for e in p["errors"]:
+        print(f"  ⚠️ record {e['record']}: {e['error']}")
+    print(f"✅ Import finished in {p['elapsed_s']}s. Run `flask --app app rebuild-vectors` "
+          f"to include the new recipes in similar-dish search.")
+
+
+@app.route("/api/import", methods=["POST"])
+def api_import():
+    """
+    Multipart upload: `file` (NDJSON / CSV / JSON array), optional `images`
+    archive, optional `format`, `restart`, `allow_duplicates`. Streams one
+    NDJSON progress object per committed batch.
+    """
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return jsonify({"error": "Missing file"}), 400
+    fmt = request.form.get("format") or detect_import_format(upload.filename, upload.stream)
+    if fmt not in ("ndjson", "csv", "json"):
+        return jsonify({"error": f"Unknown format {fmt!r}"}), 400
+
+    image_names = {}
+    archive = request.files.get("images")
+    if archive and archive.filename:
+        image_names = extract_image_archive(archive.stream, archive.filename)
+
+    fingerprint = import_fingerprint(upload.stream)
+    text = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    options = {
+        "skip_existing": request.form.get("allow_duplicates") not in ("1", "true", "on"),
+        "restart": request.form.get("restart") in ("1", "true", "on"),
+    }
+
+    def generate():
+        conn = get_conn()
+        for p in import_recipes(conn, text, fmt, f"upload:{secure_filename(upload.filename)}",
+                                fingerprint, image_names, **options):
+            yield json.dumps(p) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+# ---------------------------
+# Notebook transcriptions (spaCy → staging → recipes)
+# ---------------------------
+#   flask --app app transcribe-notebooks notebooks/ [--n-process 2]
+#   flask --app app publish-staged [--min-confidence 0.7]
+# Plain-text transcriptions of the handwritten notebooks are split into one
+# chunk per recipe (a line of dashes/equals, a form feed, or two blank
+# lines), run through nlp.pipe in batches across processes, and segmented
+# into name / ingredients / method. Ingredient lines are checked with
+# parse_ingredient_line(); the tagger only decides unlabelled lines
+# (imperative verb → method step). Results wait in recipe_staging for
+# review, then go into recipes through the bulk importer's batch writer.
+TRANSCRIBE_BATCH = 32
+TRANSCRIPT_EXTENSIONS = (".txt", ".md")
+STAGING_WRITE_BATCH = 200
+RECIPE_SPLIT_RE = re.compile(r"\n[ \t]*(?:-{3,}|={3,}|\f)[ \t]*\n|\f|\n[ \t]*\n[ \t]*\n")
+INGREDIENT_HEADERS = {"ingredients", "ingredient", "you will need", "you need"}
+METHOD_HEADERS = {"method", "directions", "instructions", "steps", "preparation", "to make"}
+BULLET_RE = re.compile(r"^[-•*·◦]+\s*")
+STEP_RE = re.compile(r"^(?:step\s*)?\d{1,2}\s*[.)]\s+", re.IGNORECASE)
+TAGS_LINE_RE = re.compile(r"^tags?\s*:\s*(.*)$", re.IGNORECASE)
+
+
+def init_staging_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_staging (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            chunk INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            ingredients TEXT NOT NULL,           -- JSON list of lines
+            method TEXT NOT NULL,
+            tags TEXT NOT NULL DEFAULT '[]',
+            raw TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',   -- pending / published / rejected
+            recipe_id INTEGER,
+            created_at REAL NOT NULL,
+            UNIQUE (source, chunk)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recipe_staging_status ON recipe_staging(status, confidence)")
+    conn.commit()
+
+
+def iter_transcriptions(paths):
+    """Yield (recipe_text, (source, chunk_no)) for every recipe in the given files/directories."""
+    for path in paths:
+        p = Path(path)
+        files = sorted(f for ext in TRANSCRIPT_EXTENSIONS for f in p.rglob(f"*{ext}")) if p.is_dir() else [p]
+        for f in files:
+            text = f.read_text(encoding="utf-8", errors="replace").replace("\r\n", "\n")
+            chunks = (c.strip() for c in RECIPE_SPLIT_RE.split(text))
+            for n, chunk in enumerate(c for c in chunks if c):
+                yield _normalize_fractions(chunk), (str(f), n)
+
+
+def _line_kind(line, span):
+    """'ingredients' or 'method' for a line outside a headed section."""
+    if STEP_RE.match(line):
+        return "method"
+    parsed = parse_ingredient_line(line) or {}
+    if parsed.get("amount") or parsed.get("unit"):
+        return "ingredients"
+    words = [t for t in span if not (t.is_punct or t.is_space)]
+    if words and words[0].pos_ == "VERB":
+        return "method"
+    if len(words) > 8 or line.endswith("."):
+        return "method"
+    return "ingredients"
+
+
+def segment_transcription(doc):
+    """One recipe's Doc → (name, ingredient lines, method steps, tags, confidence 0–1)."""
+    name, ingredients, method, tags = "", [], [], []
+    section = None
+    offset = 0
+    for raw_line in doc.text.split("\n"):
+        start, offset = offset, offset + len(raw_line) + 1
+        line = " ".join(raw_line.split())
+        if not line:
+            continue
+        if not name:
+            name = re.sub(r"^(?:recipe|title)\s*:\s*", "", line, flags=re.IGNORECASE)
+            if name.isupper():
+                name = " ".join(w.capitalize() for w in name.split())
+            continue
+
+        header = line.lower().rstrip(":").strip()
+        if header in INGREDIENT_HEADERS:
+            section = "ingredients"
+            continue
+        if header in METHOD_HEADERS:
+            section = "method"
+            continue
+        m = TAGS_LINE_RE.match(line)
+        if m:
+            tags.extend(split_raw_tags(m.group(1)))
+            continue
+
+        span = doc.char_span(start, start + len(raw_line), alignment_mode="expand") or []
+        kind = section or _line_kind(line, span)
+        # unheaded steps often follow a headed ingredient list
+        if kind == "ingredients" and section == "ingredients" and STEP_RE.match(line):
+            section = kind = "method"
+        if kind == "ingredients":
+            ingredients.append(BULLET_RE.sub("", line))
+        else:
+            method.append(STEP_RE.sub("", BULLET_RE.sub("", line)))
+
+    quantified = sum(1 for l in ingredients if (parse_ingredient_line(l) or {}).get("amount"))
+    confidence = (0.3 * bool(ingredients) + 0.3 * bool(method)
+                  + 0.4 * (quantified / len(ingredients) if ingredients else 0))
+    return name, ingredients, method, normalize_tags(json.dumps(tags)), round(confidence, 2)
+
+
+_UPSERT_STAGING = """
+    INSERT INTO recipe_staging
+        (source, chunk, name, ingredients, method, tags, raw, confidence, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?)
+    ON CONFLICT(source, chunk) DO UPDATE SET
+        name = excluded.name,
+        ingredients = excluded.ingredients,
+        method = excluded.method,
+        tags = excluded.tags,
+        raw = excluded.raw,
+        confidence = excluded.confidence,
+        created_at = excluded.created_at
+    WHERE recipe_staging.status = 'pending'
+"""
+
+
+def transcribe_notebooks(conn, paths, n_process=1, batch_size=TRANSCRIBE_BATCH):
+    """
+    Segment every transcription into recipe_staging (re-runs refresh rows
+    still pending). A generator: yields throughput stats after each write
+    batch, the last one with "done": True.
+    """
+    nlp = get_nlp()
+    t0 = time.perf_counter()
+    stats = {"docs": 0, "staged": 0, "chars": 0, "done": False}
+
+    def progress():
+        elapsed = time.perf_counter() - t0
+        return {**stats, "elapsed_s": round(elapsed, 2),
+                "docs_per_s": round(stats["docs"] / elapsed, 1) if elapsed else None,
+                "chars_per_s": round(stats["chars"] / elapsed) if elapsed else None}
+
+    pending = []
+    docs = nlp.pipe(iter_transcriptions(paths), as_tuples=True,
+                    batch_size=batch_size, n_process=n_process)
+    for doc, (source, chunk) in docs:
+        stats["docs"] += 1
+        stats["chars"] += len(doc.text)
+        name, ingredients, method, tags, confidence = segment_transcription(doc)
+        if not name:
+            continue
+        pending.append((source, chunk, name, json.dumps(ingredients), "\n".join(method),
+                        json.dumps(tags), doc.text, confidence, time.time()))
+        if len(pending) >= STAGING_WRITE_BATCH:
+            with conn:
+                conn.executemany(_UPSERT_STAGING, pending)
+            stats["staged"] += len(pending)
+            pending = []
+            yield progress()
+
+    with conn:
+        conn.executemany(_UPSERT_STAGING, pending)
+    stats["staged"] += len(pending)
+    stats["done"] = True
+    yield progress()
+
+
+def publish_staged(conn, ids=None, min_confidence=0.0):
+    """Move pending staged recipes into recipes (one transaction); returns the new recipe ids."""
+    sql = """
+        SELECT id, source, name, ingredients, method, tags
+          FROM recipe_staging
+         WHERE status = 'pending' AND confidence >= ?
+    """
+    params = [min_confidence]
+    if ids:
+        sql += f" AND id IN ({','.join(['?'] * len(ids))})"
+        params += list(ids)
+    c = conn.cursor()
+    if not conn.in_transaction:
+        c.execute("BEGIN IMMEDIATE")
+    try:
+        rows = c.execute(sql + " ORDER BY id", params).fetchall()
+        batch = [clean_import_record({
+            "name": r["name"],
+            "ingredients": json.loads(r["ingredients"]),
+            "method": r["method"],
+            "tags": json.loads(r["tags"]),
+            "source": f"notebook:{Path(r['source']).name}",
+        }) for r in rows]
+        new_ids = insert_recipe_batch(conn, batch)
+        c.executemany(
+            "UPDATE recipe_staging SET status = 'published', recipe_id = ? WHERE id = ?",
+            [(rid, r["id"]) for rid, r in zip(new_ids, rows)],
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    if new_ids:
+        data_version.bump()
+    return new_ids
+
+
+@app.cli.command("transcribe-notebooks")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--n-process", default=1, show_default=True,
+              help="spaCy worker processes, each with its own model (1-2 on the Pi)")
+@click.option("--batch-size", default=TRANSCRIBE_BATCH, show_default=True)
+def transcribe_notebooks_command(paths, n_process, batch_size):
+    """Segment notebook transcriptions (.txt/.md) into the review staging table."""
+    init_db()
+    conn = get_conn()
+    for p in transcribe_notebooks(conn, paths, n_process=n_process, batch_size=batch_size):
+        print(f"📝 {p['docs']} recipes · {p['staged']} staged · "
+              f"{p['docs_per_s'] or 0:.1f} docs/s · {(p['chars_per_s'] or 0) / 1000:.0f}k chars/s")
+    low = conn.execute(
+        "SELECT COUNT(*) FROM recipe_staging WHERE status = 'pending' AND confidence < 0.6"
+    ).fetchone()[0]
+    print(f"✅ Done in {p['elapsed_s']}s with {n_process} process(es). "
+          f"{low} pending recipes look doubtful (confidence < 0.6) — review them before publishing.")
+
+
+@app.cli.command("publish-staged")
+@click.option("--id", "ids", multiple=True, type=int, help="only these staging ids")
+@click.option("--min-confidence", default=0.0, show_default=True)
+def publish_staged_command(ids, min_confidence):
+    """Publish pending staged transcriptions into recipes."""
+    init_db()
+    new_ids = publish_staged(get_conn(), ids, min_confidence)
+    print(f"✅ Published {len(new_ids)} recipes. Run `flask --app app rebuild-vectors` "
+          f"to include them in similar-dish search.")
+
+
+@app.route("/api/staging")
+def api_staging_list():
+    """Staged transcriptions for review, least confident first."""
+    status = request.args.get("status", "pending")
+    limit = page_size_arg()
+    rows = get_conn().execute("""
+        SELECT id, source, chunk, name, ingredients, method, tags, confidence, status, recipe_id
+          FROM recipe_staging
+         WHERE status = ?
+         ORDER BY confidence, id
+         LIMIT ?
+    """, (status, limit)).fetchall()
+    return jsonify([{
+        "id": r["id"], "source": r["source"], "chunk": r["chunk"], "name": r["name"],
+        "ingredients": [{"line": line, **(parse_ingredient_line(line) or {})}
+                        for line in json.loads(r["ingredients"])],
+        "method": r["method"], "tags": json.loads(r["tags"]),
+        "confidence": r["confidence"], "status": r["status"], "recipe_id": r["recipe_id"],
+    } for r in rows])
+
+
+@app.route("/api/staging/<int:staging_id>", methods=["POST"])
+def api_staging_review(staging_id):
+    """
+    Review one staged recipe: {"action": "update" | "publish" | "reject"}
+    plus optional corrected name / ingredients (list) / method / tags.
+    """
+    data = request.get_json(force=True)
+    action = data.get("action", "update")
+    if action not in ("update", "publish", "reject"):
+        return jsonify({"error": f"Unknown action {action!r}"}), 400
+
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT status FROM recipe_staging WHERE id = ?", (staging_id,)
+        ).fetchone()
+        if not row:
+            return jsonify({"error": "Not found"}), 404
+        if row["status"] != "pending":
+            return jsonify({"error": f"Already {row['status']}"}), 409
+
+        edits = {}
+        if "name" in data:
+            edits["name"] = str(data["name"]).strip()
+        if "ingredients" in data:
+            edits["ingredients"] = json.dumps([str(l).strip() for l in data["ingredients"] if str(l).strip()])
+        if "method" in data:
+            edits["method"] = str(data["method"]).strip()
+        if "tags" in data:
+            edits["tags"] = json.dumps(normalize_tags(json.dumps(data["tags"])))
+        if edits:
+            conn.execute(
+                f"UPDATE recipe_staging SET {', '.join(f'{k} = ?' for k in edits)} WHERE id = ?",
+                (*edits.values(), staging_id),
+            )
+        if action == "reject":
+            conn.execute("UPDATE recipe_staging SET status = 'rejected' WHERE id = ?", (staging_id,))
+
+    if action == "publish":
+        try:
+            new_ids = publish_staged(get_conn(), [staging_id])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"status": "published", "recipe_id": new_ids[0] if new_ids else None})
+    return jsonify({"status": "rejected" if action == "reject" else "updated"})
+
+
+# ---------------------------
+# Recipe image cache (proxy + resized variants)
+# ---------------------------
+# Most image_url values point at the sites the recipes came from. Pages link
+# to /recipe/<id>/image/<variant>.<fmt> instead, which fetches the original
+# once, stores it content-addressed under IMAGE_CACHE_DIR (<sha256>/original.*)
+# and redirects to /images/<sha256>/<variant>.<fmt>. That URL never changes
+# meaning, so it is served as immutable. The thumb/detail variants are built
+# by a small thread pool; until one exists the original is served with a
+# short max-age. Once the directory passes IMAGE_CACHE_BYTES the least
+# recently served files go first (mtime is the LRU clock).
+# Resizing needs Pillow; without it the cached originals are served as is.
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_DIR = Path(os.environ.get("IMAGE_CACHE_DIR") or Path(__file__).with_name("image_cache"))
+IMAGE_CACHE_BYTES = int(os.environ.get("IMAGE_CACHE_BYTES", 512 * 1024 * 1024))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+IMAGE_FETCH_TIMEOUT = 10
+IMAGE_FETCH_MAX_BYTES = 15 * 1024 * 1024
+IMAGE_RETRY_AFTER_S = 6 * 3600     # don't hammer a source that has gone away
+IMAGE_TOUCH_AFTER_S = 3600         # refresh the LRU mtime at most hourly
+# longest edge in px — 2x the CSS size on the list and detail pages
+IMAGE_VARIANTS = {"thumb": 160, "detail": 480}
+IMAGE_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMAGE_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp", "gif": "image/gif"}
+IMAGE_HASH_RE = re.compile(r"[0-9a-f]{64}")
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class ImageFetchError(Exception):
+    pass
+
+
+def fetch_image_http(url: str) -> bytes:
+    """Default fetcher: GET an http(s) URL with a timeout and a size cap."""
+    if not url.lower().startswith(("http://", "https://")):
+        raise ImageFetchError(f"unsupported image URL: {url[:80]}")
+    try:
+        with requests.get(url, stream=True, timeout=IMAGE_FETCH_TIMEOUT,
+                          headers={"User-Agent": "SalimasRecipes image cache"}) as r:
+            r.raise_for_status()
+            body = bytearray()
+            for chunk in r.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > IMAGE_FETCH_MAX_BYTES:
+                    raise ImageFetchError("image too large")
+    except requests.RequestException as e:
+        raise ImageFetchError(str(e)) from e
+    return bytes(body)
+
+
+def sniff_image_type(data: bytes):
+    """File extension from the magic bytes (never trust the server's header)."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def init_image_cache_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_cache (
+            url TEXT PRIMARY KEY,
+            hash TEXT,
+            ext TEXT,
+            bytes INTEGER,
+            checked_at INTEGER NOT NULL,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_image_cache_hash ON image_cache(hash)")
+    conn.commit()
+
+
+class ImageCache:
+    """
+    Content-addressed originals + resized variants on disk. `fetcher` is any
+    callable url -> bytes, so tests (or an offline Pi) can swap in their own.
+    """
+
+    def __init__(self, root, max_bytes: int, fetcher=fetch_image_http, workers: int = IMAGE_WORKERS):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._url_locks = [threading.Lock() for _ in range(16)]
+        self._pool = None
+        self._pending = set()   # (digest, variant) being built
+        self._bytes = None      # total on disk; scanned on first write
+        self.fetches = 0
+        self.fetch_errors = 0
+        self.evictions = 0
+
+    # --- paths ---
+    def _dir(self, digest):
+        return self.root / digest[:2] / digest
+
+    def original_path(self, digest):
+        d = self._dir(digest)
+        if d.is_dir():
+            for p in d.iterdir():
+                if p.stem == "original":
+                    return p
+        return None
+
+    def variant_path(self, digest, variant, fmt):
+        return self._dir(digest) / f"{variant}.{fmt}"
+
+    # --- originals ---
+    def _read_source(self, url: str) -> bytes:
+        # images unpacked by the bulk importer live under /static
+        if url.startswith("/static/"):
+            static = Path(app.static_folder).resolve()
+            path = (static / url[len("/static/"):]).resolve()
+            if static not in path.parents or not path.is_file():
+                raise ImageFetchError(f"no such static image: {url}")
+            return path.read_bytes()
+        return self.fetcher(url)
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._account(len(data))
+
+    def ensure(self, conn, url: str):
+        """(digest, original path) for `url`, fetching it on first use; None if unavailable."""
+        def cached():
+            row = conn.execute("SELECT hash, checked_at, error FROM image_cache WHERE url = ?",
+                               (url,)).fetchone()
+            if row and row[0]:
+                path = self.original_path(row[0])
+                if path is not None:
+                    return (row[0], path)
+            if row and row[2] and time.time() - row[1] < IMAGE_RETRY_AFTER_S:
+                return False
+            return None
+
+        hit = cached()
+        if hit is not None:
+            return hit or None
+        with self._url_locks[hash(url) % len(self._url_locks)]:
+            hit = cached()   # another request may have fetched it meanwhile
+            if hit is not None:
+                return hit or None
+            self.fetches += 1
+            try:
+                data = self._read_source(url)
+                ext = sniff_image_type(data)
+                if ext is None:
+                    raise ImageFetchError("not an image")
+            except (ImageFetchError, OSError) as e:
+                self.fetch_errors += 1
+                with conn:
+                    conn.execute("""
+                        INSERT INTO image_cache (url, checked_at, error) VALUES (?, ?, ?)
+                        ON CONFLICT(url) DO UPDATE SET checked_at = excluded.checked_at,
+                                                       error = excluded.error
+                    """, (url, int(time.time()), str(e)[:200]))
+                app.logger.warning("image fetch failed for %s: %s", url, e)
+                return None
+
+            digest = hashlib.sha256(data).hexdigest()
+            path = self._dir(digest) / f"original.{ext}"
+            if not path.exists():
+                self._write(path, data)
+            with conn:
+                conn.execute("""
+                    INSERT INTO image_cache (url, hash, ext, bytes, checked_at, error)
+                    VALUES (?, ?, ?, ?, ?, NULL)
+                    ON CONFLICT(url) DO UPDATE SET hash = excluded.hash, ext = excluded.ext,
+                        bytes = excluded.bytes, checked_at = excluded.checked_at, error = NULL
+                """, (url, digest, ext, len(data), int(time.time())))
+        self.request_variants(digest)
+        self.evict()
+        return (digest, path)
+
+    def url_for_hash(self, conn, digest):
+        row = conn.execute("SELECT url FROM image_cache WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+        return row[0] if row else None
+
+    # --- variants ---
+    def request_variants(self, digest, variants=IMAGE_VARIANTS):
+        """Queue any missing variants of `digest` on the worker pool."""
+        if Image is None:
+            return []
+        futures = []
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="image-variants")
+            for variant in variants:
+                if (digest, variant) in self._pending:
+                    continue
+                if all(self.variant_path(digest, variant, fmt).exists() for fmt in IMAGE_FORMATS):
+                    continue
+                self._pending.add((digest, variant))
+                futures.append(self._pool.submit(self._build, digest, variant))
+        return futures
+
+    def _build(self, digest, variant):
+        try:
+            source = self.original_path(digest)
+            if source is None:
+                return
+            size = IMAGE_VARIANTS[variant]
+            with Image.open(source) as im:
+                im = ImageOps.exif_transpose(im)
+                im.thumbnail((size, size), Image.LANCZOS)
+                if im.mode in ("RGBA", "LA", "P"):
+                    # JPEG has no alpha: flatten transparent PNGs onto white
+                    im = im.convert("RGBA")
+                    flat = Image.new("RGB", im.size, "white")
+                    flat.paste(im, mask=im.getchannel("A"))
+                    im = flat
+                elif im.mode != "RGB":
+                    im = im.convert("RGB")
+                for fmt, (pil_format, _, options) in IMAGE_FORMATS.items():
+                    buf = io.BytesIO()
+                    try:
+                        im.save(buf, pil_format, **options)
+                    except (OSError, KeyError) as e:   # e.g. Pillow built without WebP
+                        app.logger.warning("image variant %s.%s failed: %s", variant, fmt, e)
+                        continue
+                    self._write(self.variant_path(digest, variant, fmt), buf.getvalue())
+        except Exception:
+            app.logger.exception("image variant %s for %s failed", variant, digest[:12])
+        finally:
+            with self._lock:
+                self._pending.discard((digest, variant))
+        self.evict()
+
+    # --- serving + LRU budget ---
+    def touch(self, path: Path):
+        try:
+            now = time.time()
+            if now - path.stat().st_mtime > IMAGE_TOUCH_AFTER_S:
+                os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def _account(self, n):
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += n
+
+    def _scan(self):
+        files = []
+        if self.root.is_dir():
+            for dirpath, _, names in os.walk(self.root):
+                for name in names:
+                    p = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, p))
+        return files
+
+    def evict(self):
+        """Delete least-recently-served files until under 90% of the budget."""
+        with self._lock:
+            if self._bytes is not None and self._bytes <= self.max_bytes:
+                return
+            files = self._scan()
+            total = sum(f[1] for f in files)
+            if total > self.max_bytes:
+                target = self.max_bytes * 0.9
+                for _, size, p in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.unlink(p)
+                    except OSError:
+                        continue
+                    total -= size
+                    self.evictions += 1
+                    try:
+                        os.rmdir(os.path.dirname(p))   # only succeeds once empty
+                    except OSError:
+                        pass
+            self._bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes, "fetches": self.fetches,
+                    "fetch_errors": self.fetch_errors, "evictions": self.evictions,
+                    "building": len(self._pending), "resizing": Image is not None}
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_BYTES)
+
+
+def recipe_image_urls(conn, recipe_id, image_url, variant):
+    """{fmt: url} for a recipe image — the immutable URL when already cached."""
+    if not image_url:
+        return None
+    row = conn.execute("SELECT hash FROM image_cache WHERE url = ?", (image_url,)).fetchone()
+    if row and row[0] and image_cache.original_path(row[0]) is not None:
+        return {fmt: url_for("cached_image", digest=row[0], variant=variant, fmt=fmt)
+                for fmt in IMAGE_FORMATS}
+    return {fmt: url_for("recipe_image", recipe_id=recipe_id, variant=variant, fmt=fmt)
+            for fmt in IMAGE_FORMATS}
+
+
+def _send_image(path: Path, mimetype: str, immutable: bool):
+    image_cache.touch(path)
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    # until the variant exists, let the browser come back for it soon
+    response.headers["Cache-Control"] = CACHE_IMMUTABLE if immutable else "public, max-age=300"
+    return response
+
+
+@app.route("/recipe/<int:recipe_id>/image/<variant>.<fmt>")
+def recipe_image(recipe_id, variant, fmt):
+    """Fetch-once proxy for a recipe's image_url; redirects to the immutable URL."""
+    if variant not in IMAGE_VARIANTS or fmt not in IMAGE_FORMATS:
+        abort(404)
+    conn = get_conn()
+    row = conn.execute("SELECT image_url FROM recipes WHERE id = ?", (recipe_id,)).fetchone()
+    if not row or not row[0]:
+        abort(404)
+    cached = image_cache.ensure(conn, row[0])
+    if cached is None:
+        # we couldn't get it; the visitor's browser may still be able to
+        return redirect(row[0])
+    response = redirect(url_for("cached_image", digest=cached[0], variant=variant, fmt=fmt))
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
+
+@app.route("/images/<digest>/<variant>.<fmt>")
+def cached_image(digest, variant, fmt):
+    if not IMAGE_HASH_RE.fullmatch(digest) or variant not in IMAGE_VARIANTS or fmt not in IMAGE_FORMATS:
+        abort(404)
+    path = image_cache.variant_path(digest, variant, fmt)
+    if path.exists():
+        return _send_image(path, IMAGE_FORMATS[fmt][1], immutable=True)
+
+    original = image_cache.original_path(digest)
+    if original is None:
+        # evicted: fetch it again from wherever it came from
+        conn = get_conn()
+        url = image_cache.url_for_hash(conn, digest)
+        cached = image_cache.ensure(conn, url) if url else None
+        if cached is None:
+            abort(404)
+        if cached[0] != digest:   # the source changed under us
+            return redirect(url_for("cached_image", digest=cached[0], variant=variant, fmt=fmt))
+        original = cached[1]
+    image_cache.request_variants(digest, [variant])
+    return _send_image(original, IMAGE_TYPES.get(original.suffix[1:], "application/octet-stream"),
+                       immutable=False)
+
+
+@app.cli.command("cache-images")
+@click.option("--retry-failed", is_flag=True, help="Refetch URLs that failed recently.")
+def cache_images_command(retry_failed):
+    """Fetch every recipe image into the local cache and build its variants."""
+    conn = get_conn()
+    if retry_failed:
+        with conn:
+            conn.execute("DELETE FROM image_cache WHERE hash IS NULL")
+    urls = [r[0] for r in conn.execute(
+        "SELECT DISTINCT image_url FROM recipes WHERE image_url IS NOT NULL AND image_url != ''")]
+    t0 = time.perf_counter()
+    cached = failed = 0
+    futures = []
+    for url in urls:
+        hit = image_cache.ensure(conn, url)
+        if hit is None:
+            failed += 1
+            continue
+        cached += 1
+        futures += image_cache.request_variants(hit[0])
+    for f in futures:
+        f.result()
+    stats = image_cache.stats()
+    print(f"🖼️ {cached} images cached, {failed} unavailable, {len(futures)} variant jobs "
+          f"in {time.perf_counter() - t0:.1f}s · {(stats['bytes'] or 0) / 1e6:.1f} MB on disk")
+    if Image is None:
+        print("⚠️ Pillow is not installed — originals are served without resizing.")
+
+
+# ---------------------------
+# Static asset bundles (fingerprinted + precompressed)
+# ---------------------------
+# Each bundle is concatenated from files in static/, minified, named after a
+# hash of its content (static/dist/planner.3f9c1a2b7e.js) and written next to
+# .gz and .br copies. Templates link them through asset_urls(), and
+# /assets/<file> serves the smallest encoding the browser accepts as
+# immutable: a changed file gets a new name, so browsers never revalidate.
+# Bundles are rebuilt at startup when a source is newer than the manifest
+# (and on every render in debug mode); `flask build-assets` forces it.
+# Minification only strips comments and whitespace, so no JS/CSS parser is
+# needed; brotli output needs the Brotli package and is skipped without it.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ASSET_DIR = Path(app.static_folder) / "dist"
+ASSET_MANIFEST = ASSET_DIR / "manifest.json"
+ASSET_BUILD_VERSION = 1   # bump when the minifiers change
+ASSET_KEEP_OLD_S = 24 * 3600   # old bundles stay a day for pages still open
+ASSET_BUNDLES = {
+    "site.css": ["style.css"],
+    "planner.css": ["style.css", "planner.css"],
+    "planner.js": ["planner.js", "planner_recipes.js", "planner_grid.js"],
+}
+
+_CSS_TOKEN_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+
+
+def _minify_css_text(text):
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)   # never before ':' — "a :hover" means something
+    return text.replace(";}", "}")
+
+
+def minify_css(src: str) -> str:
+    out, text, pos = [], [], 0
+    for m in _CSS_TOKEN_RE.finditer(src):
+        text.append(src[pos:m.start()])
+        if m.group().startswith("/*"):
+            text.append(" ")
+        else:   # strings go through untouched
+            out += [_minify_css_text("".join(text)), m.group()]
+            text = []
+        pos = m.end()
+    text.append(src[pos:])
+    out.append(_minify_css_text("".join(text)))
+    return "".join(out).strip()
+
+
+_JS_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+_JS_REGEX_KEYWORDS = re.compile(r"(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await|throw|new|delete)$")
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in "_$\\" or ord(ch) > 127
+
+
+def _skip_js_string(src, i):
+    """Index just past the string/template literal starting at src[i]."""
+    quote, i = src[i], i + 1
+    while i < len(src):
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == quote:
+            return i + 1
+        if quote == "`" and src.startswith("${", i):
+            i = _skip_js_code(src, i + 2)
+            continue
+        i += 1
+    return i
+
+
+def _skip_js_code(src, i):
+    """Index just past the '}' closing a template ${...} expression."""
+    depth = 1
+    while i < len(src):
+        ch = src[i]
+        if ch in "'\"`":
+            i = _skip_js_string(src, i)
+            continue
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_js_regex(src, i):
+    i += 1
+    in_class = False
+    while i < len(src) and src[i] != "\n":
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            in_class = True
+        elif ch == "]":
+            in_class = False
+        elif ch == "/" and not in_class:
+            i += 1
+            while i < len(src) and _is_word(src[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minify_js(src: str) -> str:
+    """
+    Drop comments and redundant whitespace. Newlines are kept wherever ASI
+    could care, and strings, template literals and regexes are copied as is.
+    """
+    out, last, ws = [], "", None
+    i, n = 0, len(src)
+    while i < n:
+        ch = src[i]
+        if ch in " \t\r\n":
+            ws = "\n" if ch == "\n" or ws == "\n" else " "
+            i += 1
+            continue
+        if src.startswith("//", i):
+            j = src.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        if src.startswith("/*", i):
+            j = src.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            ws = ws or " "
+            continue
+
+        if ws and out:
+            if ws == "\n" and last not in ";{,([" and ch not in ")]},;.":
+                out.append("\n")
+            elif (_is_word(last) and _is_word(ch)) or (last in "+-" and ch == last):
+                out.append(" ")
+        ws = None
+
+        if ch in "'\"`":
+            j = _skip_js_string(src, i)
+        elif ch == "/" and (not last or last in _JS_REGEX_AFTER
+                            or _JS_REGEX_KEYWORDS.search("".join(out[-12:]))):
+            j = _skip_js_regex(src, i)
+        else:
+            out.append(ch)
+            last = ch
+            i += 1
+            continue
+        out.append(src[i:j])
+        last = src[j - 1]
+        i = j
+    return "".join(out).strip() + "\n"
 
-from collections import Counter
-import json
-import re
 
-from collections import Counter
-import json
-import re
+def _asset_sources_mtime():
+    static = Path(app.static_folder)
+    return max((static / f).stat().st_mtime
+               for files in ASSET_BUNDLES.values() for f in files)
 
-def get_tag_cloud():
-    """Return a dict of {tag: count} for all recipes, cleaned and normalized."""
-    with get_conn() as conn:
-        c = conn.cursor()
-        c.execute("SELECT tags FROM recipes")
-        rows = c.fetchall()
 
-    all_tags = []
+def build_assets(force=False) -> dict:
+    """Rebuild stale bundles; returns {bundle: {"file", "raw", "min", "gz", "br"}}."""
+    try:
+        current = json.loads(ASSET_MANIFEST.read_text())
+    except (OSError, ValueError):
+        current = {}
+    if (not force and current.get("version") == ASSET_BUILD_VERSION
+            and ASSET_MANIFEST.stat().st_mtime >= _asset_sources_mtime()):
+        return current["bundles"]
+
+    static = Path(app.static_folder)
+    ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    bundles = {}
+    for bundle, files in ASSET_BUNDLES.items():
+        stem, suffix = os.path.splitext(bundle)
+        minify = minify_js if suffix == ".js" else minify_css
+        raw = [(static / f).read_text(encoding="utf-8") for f in files]
+        # ';' keeps one file's last statement from running into the next
+        joiner = ";\n" if suffix == ".js" else "\n"
+        data = joiner.join(minify(text) for text in raw).encode("utf-8")
+        name = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{suffix}"
+        encoded = {"": data, ".gz": gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            encoded[".br"] = brotli.compress(data, quality=11)
+        for ext, blob in encoded.items():
+            path = ASSET_DIR / (name + ext)
+            if not path.exists():
+                fd, tmp = tempfile.mkstemp(dir=ASSET_DIR, prefix=".tmp-")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(blob)
+                os.replace(tmp, path)
+        bundles[bundle] = {"file": name, "raw": sum(len(t.encode()) for t in raw),
+                           "min": len(data), "gz": len(encoded[".gz"]),
+                           "br": len(encoded[".br"]) if ".br" in encoded else None}
+
+    fd, tmp = tempfile.mkstemp(dir=ASSET_DIR, prefix=".tmp-")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"version": ASSET_BUILD_VERSION, "bundles": bundles}, f, indent=2)
+    os.replace(tmp, ASSET_MANIFEST)
+
+    live = {b["file"] + ext for b in bundles.values() for ext in ("", ".gz", ".br")}
+    cutoff = time.time() - ASSET_KEEP_OLD_S
+    for path in ASSET_DIR.iterdir():
+        if path.name not in live and path != ASSET_MANIFEST and path.stat().st_mtime < cutoff:
+            path.unlink()
+    return bundles
+
+
+def load_assets(force=False):
+    global _asset_bundles
+    try:
+        _asset_bundles = build_assets(force)
+    except OSError as e:
+        # read-only checkout etc.: templates fall back to the plain files
+        app.logger.warning("asset build failed, serving unbundled files: %s", e)
+        _asset_bundles = {}
+    return _asset_bundles
 
-    # Common normalizations / synonyms
-    normalize_map = {
-        "soups": "soup",
-        "salads": "salad",
-        "fish & seafood": "seafood",
-        "seafood & fish": "seafood",
-        "pasta dishes": "pasta",
-        "curries": "curry",
-        "desserts": "dessert",
-        "cakes": "cake",
-        "cookies": "cookie",
-        "breads": "bread",
-    }
 
-    for row in rows:
-        raw = row[0]
-        if not raw:
-            continue
+def asset_urls(bundle):
+    """URLs to include for `bundle` — one fingerprinted file, or its sources as a fallback."""
+    bundles = load_assets() if app.debug else _asset_bundles
+    entry = bundles.get(bundle)
+    if entry:
+        return [url_for("asset_file", filename=entry["file"])]
+    return [url_for("static", filename=f) for f in ASSET_BUNDLES[bundle]]
 
-        tags = []
 
-        # --- Try JSON decode first ---
-        if raw.strip().startswith("["):
-            try:
-                decoded = json.loads(raw)
-                if isinstance(decoded, list):
-                    tags = decoded
-                elif isinstance(decoded, str):
-                    tags = [decoded]
-            except Exception:
-                cleaned = raw.strip("[]'\" ")
-                tags = re.split(r"[,;]", cleaned)
-        else:
-            tags = re.split(r"[,;]", raw)
+app.jinja_env.globals["asset_urls"] = asset_urls
+_asset_bundles = {}
+load_assets()
 
-        # --- Normalize ---
-        cleaned_tags = []
-        for t in tags:
-            t = re.sub(r'[^a-zA-Z0-9 &-]', '', t).strip().lower()
-            if not t:
-                continue
-            # singularize simple plurals (quick heuristic)
-            if t.endswith("s") and len(t) > 3:
-                t = t[:-1]
-            # apply synonym map
-            if t in normalize_map:
-                t = normalize_map[t]
-            cleaned_tags.append(t)
 
-        all_tags.extend(cleaned_tags)
+@app.route("/assets/<filename>")
+def asset_file(filename):
+    if "/" in filename or filename.startswith("."):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[encoding] and (ASSET_DIR / (filename + ext)).is_file():
+            response = send_from_directory(ASSET_DIR, filename + ext, mimetype=mimetype)
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(ASSET_DIR, filename, mimetype=mimetype)
+    response.headers["Cache-Control"] = CACHE_IMMUTABLE
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
 
-    counts = Counter(all_tags)
-    return sorted(counts.items(), key=lambda x: x[0])
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Rebuild the fingerprinted CSS/JS bundles in static/dist."""
+    bundles = load_assets(force=True)
+    for bundle, b in bundles.items():
+        br = f" · br {b['br'] / 1024:.1f} KB" if b["br"] else ""
+        print(f"📦 {bundle} → {b['file']}: {b['raw'] / 1024:.1f} KB → min {b['min'] / 1024:.1f} KB"
+              f" · gz {b['gz'] / 1024:.1f} KB{br}")
+    if brotli is None:
+        print("⚠️ Brotli is not installed — only gzip copies were written.")
 
 
 # ---------------------------
@@ -441,25 +3720,12 @@ def recipe_list_home():
     ]
 
     # === Load Quick Access tags from tags.json ===
-    from pathlib import Path
-    import json
-
-    tags_path = Path("tags.json")
-    quick_access = []
+    quick_access = tag_config.quick_access(default=["Favourites", "Easy Lunch"])
+    # combine all tag groups for tag cloud, if you use it
     all_tags = []
-
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-            # combine all tag groups for tag cloud, if you use it
-            for group_tags in tags_data.values():
-                if isinstance(group_tags, list):
-                    all_tags.extend(group_tags)
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
-    else:
-        quick_access = ["Favourites", "Easy Lunch"]
+    for group_tags in load_tags_json().values():
+        if isinstance(group_tags, list):
+            all_tags.extend(group_tags)
 
     # === Render the page ===
     return render_template(
@@ -475,6 +3741,7 @@ def recipe_list_home():
 
 
 @app.route("/recipe/<int:recipe_id>")
+@cached_page(vary=similar_stamp)
 def recipe_detail(recipe_id):
     row = get_recipe(recipe_id)
     if not row:
@@ -486,18 +3753,10 @@ def recipe_detail(recipe_id):
         created_at, updated_at
     ) = row
 
-    import json
-    try:
-        if ingredients and ingredients.strip().startswith("["):
-            ingredients_parsed = json.loads(ingredients)
-            if isinstance(ingredients_parsed, str):
-                ingredients_parsed = json.loads(ingredients_parsed)
-        else:
-            text = (ingredients or "").replace(",", "\n")
-            ingredients_parsed = [i.strip() for i in text.splitlines() if i.strip()]
-    except Exception:
-        text = (ingredients or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
-        ingredients_parsed = [i.strip() for i in text.splitlines() if i.strip()]
+    # Pre-parsed at save time (see recipe_ingredients)
+    conn = get_conn()
+    lines = get_recipe_ingredients(conn, [rid])[rid]
+    ingredients_parsed = [r["raw"] for r in lines]
 
     return render_template(
         "recipe_detail.html",
@@ -507,6 +3766,8 @@ def recipe_detail(recipe_id):
         raw_ingredients=ingredients or "",
         method=method or "",
         image_url=image_url or "",
+        image=recipe_image_urls(conn, rid, image_url, "detail"),
+        similar=similar_recipes(conn, rid),
         tags=tags or "",
         linked_recipe=linked_recipe or "",
         notes=notes or ""
@@ -631,35 +3892,172 @@ def admin_tags():
     return render_template("admin_tags.html", tags_dict=tags_dict)
 
 
+# ---------------------------
+# Recipe list pages (keyset pagination)
+# ---------------------------
+# Home and search render the first page only; "Load more" fetches the next
+# one from /api/recipes. Ordered listings page by keyset — id for newest
+# first, (name, id) for A–Z — so every page is one index range scan no
+# matter how deep. Relevance results are capped at SEARCH_LIMIT already,
+# so their cursor is simply an offset into the ranking.
+PAGE_SIZE = 50
+PAGE_SIZE_MAX = 200
+
+
+def page_size_arg():
+    try:
+        n = int(request.args.get("limit", PAGE_SIZE))
+    except ValueError:
+        n = PAGE_SIZE
+    return max(1, min(n, PAGE_SIZE_MAX))
+
+
+def encode_cursor(*key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+OFFSET_KEY = (int,)         # relevance results: offset into the ranking
+ID_KEY = (int,)             # newest first
+NAME_KEY = (str, int)       # A–Z, tag listings and the LIKE fallback: (name, id)
+
+
+def decode_cursor(token, *shapes):
+    """
+    Opaque cursor -> list of key values (None for the first page). The key
+    must match one of `shapes` (tuples of types, ints non-negative); 400 on
+    junk or on a cursor made for a different listing.
+    """
+    if not token:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        abort(400, "Bad cursor")
+    if isinstance(key, list) and any(_cursor_fits(key, shape) for shape in shapes):
+        return key
+    abort(400, "Bad cursor")
+
+
+def _cursor_fits(key, shape):
+    # type() rather than isinstance(): JSON true/false must not pass as ints
+    return len(key) == len(shape) and all(
+        type(v) is t and (t is not int or v >= 0) for v, t in zip(key, shape))
+
+
+def recipe_page(conn, q="", tag="", mode="", order="name", after=None, limit=PAGE_SIZE):
+    """
+    One page of list rows (id, name, snippet) and the cursor for the next
+    page (None on the last one). Reads limit + 1 rows to know if more exist.
+    """
+    c = conn.cursor()
+
+    if q and mode == "semantic":
+        # top-k only; falls back to keyword search until vectors are built
+        rows = search_recipes_semantic(conn, q) or search_recipes_fts(conn, q, limit)
+        return rows, None
+
+    if q:
+        # BM25 order has no key to seek on, so FTS pages by OFFSET (bounded
+        # by SEARCH_LIMIT); the LIKE fallback pages by (name, id).
+        key = decode_cursor(after, OFFSET_KEY, NAME_KEY)
+        if not key or _cursor_fits(key, OFFSET_KEY):
+            offset = key[0] if key else 0
+            try:
+                # BM25-ranked FTS5 lookup with highlighted snippets
+                rows = search_recipes_fts(conn, q, min(limit + 1, max(SEARCH_LIMIT - offset, 0)), offset)
+                if not rows and not offset:
+                    # nothing spelt that way: try close matches (one page, no cursor)
+                    return trigram_index.search(conn, q, limit), None
+                more = len(rows) > limit
+                return rows[:limit], encode_cursor(offset + limit) if more else None
+            except sqlite3.OperationalError as e:
+                # Index not built yet (run `flask --app app rebuild-search`)
+                print("⚠️ FTS search unavailable, falling back to LIKE:", e)
+                if key:
+                    abort(400, "Bad cursor")   # an FTS offset means nothing to LIKE
+        name, rid = key or ("", 0)
+        c.execute("""
+            SELECT id, name, NULL
+            FROM recipes
+            WHERE (name LIKE ? OR ingredients LIKE ? OR tags LIKE ?) AND (name, id) > (?, ?)
+            ORDER BY name, id
+            LIMIT ?
+        """, (f"%{q}%", f"%{q}%", f"%{q}%", name, rid, limit + 1))
+        rows = c.fetchall()
+        if not rows and not key:
+            return trigram_index.search(conn, q, limit), None
+    elif tag:
+        # Exact match on the normalized tag index ("Pasta" ≠ "Pasta bake")
+        rows = recipes_with_tag(conn, tag, after=decode_cursor(after, NAME_KEY), limit=limit + 1)
+    elif order == "newest":
+        key = decode_cursor(after, ID_KEY)
+        c.execute("""
+            SELECT id, name, NULL FROM recipes
+            WHERE id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (key[0] if key else 1 << 62, limit + 1))
+        rows = c.fetchall()
+        more = len(rows) > limit
+        return rows[:limit], encode_cursor(rows[limit - 1][0]) if more else None
+    else:
+        name, rid = decode_cursor(after, NAME_KEY) or ("", 0)
+        c.execute("""
+            SELECT id, name, NULL FROM recipes
+            WHERE (name, id) > (?, ?)
+            ORDER BY name, id
+            LIMIT ?
+        """, (name, rid, limit + 1))
+        rows = c.fetchall()
+
+    more = len(rows) > limit
+    last = rows[limit - 1] if more else None
+    return rows[:limit], encode_cursor(last[1], last[0]) if more else None
+
+
+def _next_page_url(cursor, **params):
+    if not cursor:
+        return None
+    return url_for("api_recipes", after=cursor, **{k: v for k, v in params.items() if v})
+
+
+@app.route("/api/recipes")
+def api_recipes():
+    """Next page for "Load more": same filters as /search plus after= and limit=."""
+    q = request.args.get("q", "").strip()
+    tag = request.args.get("tag", "").strip()
+    mode = request.args.get("mode", "").strip()
+    order = request.args.get("order", "name")
+    limit = page_size_arg()
+    with get_conn() as conn:
+        rows, cursor = recipe_page(conn, q, tag, mode, order, request.args.get("after"), limit)
+    return jsonify({
+        "items": [{"id": r[0], "name": r[1], "snippet": str(r[2]) if r[2] else None} for r in rows],
+        "next": cursor,
+        "next_url": _next_page_url(cursor, q=q, tag=tag, mode=mode, order=order,
+                                   limit=request.args.get("limit")),
+    })
+
+
 @app.route("/")
+@cached_page
 def index():
+    limit = page_size_arg()
     with get_conn() as conn:
-        c = conn.cursor()
         default_tag = None
-        # Show all recipes, newest first
-        c.execute("SELECT id, name, ingredients FROM recipes ORDER BY id DESC")
-        recipes = c.fetchall()
+        # First page of recipes, newest first
+        recipes, cursor = recipe_page(conn, order="newest", limit=limit)
 
         # Load tag counts for the tag cloud
-        tag_cloud = get_tag_cloud()
+        tag_cloud = get_tag_cloud(conn)
 
     # ✅ Load Quick Access tags from tags.json
-    from pathlib import Path
-    import json
-
-    tags_path = Path("tags.json")
-    quick_access = []
-
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
+    quick_access = tag_config.quick_access()
 
     return render_template(
         "index.html",
         recipes=recipes,
+        next_url=_next_page_url(cursor, order="newest", limit=request.args.get("limit")),
         tag_cloud=tag_cloud,
         default_tag=default_tag,
         quick_access=quick_access
@@ -667,71 +4065,32 @@ def index():
 
 
 @app.route("/search")
+@cached_page
 def search():
     q = request.args.get("q", "").strip()
     tag = request.args.get("tag", "").strip()
-    results = []
+    mode = request.args.get("mode", "").strip()
+    limit = page_size_arg()
 
     with get_conn() as conn:
-        c = conn.cursor()
-        # Decide what to filter by
-        if q:
-            c.execute("""
-                SELECT id, name, ingredients, tags
-                FROM recipes
-                WHERE name LIKE ? OR ingredients LIKE ? OR tags LIKE ?
-                ORDER BY name
-            """, (f"%{q}%", f"%{q}%", f"%{q}%"))
-        elif tag:
-            c.execute("""
-                SELECT id, name, ingredients, tags
-                FROM recipes
-                WHERE tags LIKE ?
-                ORDER BY name
-            """, (f"%{tag}%",))
-        else:
-            c.execute("SELECT id, name, ingredients, tags FROM recipes ORDER BY name")
-        results = c.fetchall()
+        results, cursor = recipe_page(conn, q, tag, mode, "name", request.args.get("after"), limit)
 
         # For the tag cloud on search pages
-        tag_cloud = get_tag_cloud()
+        tag_cloud = get_tag_cloud(conn)
 
     # ✅ Load Quick Access tags (so they persist after search)
-    from pathlib import Path
-    import json
-
-    tags_path = Path("tags.json")
-    quick_access = []
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
+    quick_access = tag_config.quick_access()
 
     return render_template(
         "index.html",
         recipes=results,
+        next_url=_next_page_url(cursor, q=q, tag=tag, mode=mode, limit=request.args.get("limit")),
         tag_cloud=tag_cloud,
         default_tag=tag or q or "Results",
         quick_access=quick_access
     )
 
 
-    # ✅ Load Quick Access tags from tags.json
-    from pathlib import Path
-    import json
-
-    tags_path = Path("tags.json")
-    quick_access = []
-    if tags_path.exists():
-        try:
-            tags_data = json.loads(tags_path.read_text(encoding="utf-8"))
-            quick_access = tags_data.get("Quick Access", [])
-        except Exception as e:
-            print("⚠️ Error loading tags.json:", e)
-
-
 @app.route("/planner")
 def planner():
     return render_template("planner.html")
@@ -740,52 +4099,103 @@ def planner():
 # ============================================================
 #  🧠 Auto-suggest for ingredient input (prefix-biased)
 # ============================================================
-@app.route("/api/shopping_list/suggestions")
-def api_shopping_list_suggestions():
-    """Return distinct item names that begin with (or contain) the query."""
-    q = request.args.get("q", "").strip().lower()
+# Suggestions come from an in-memory index of every item name ever listed:
+# a sorted array of lowercased names for bisect prefix ranges, plus a
+# substring fallback. Matches are ranked by how often the item is added and
+# how recently. Writes in this process update it directly; changes made by
+# other workers are picked up by a version check at most every
+# SUGGEST_REFRESH_S seconds, so typing never hits SQLite.
+SUGGEST_LIMIT = 10
+SUGGEST_REFRESH_S = 30
+SUGGEST_HALF_LIFE_DAYS = 21
+
+
+def _parse_ts(value):
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []       # sorted lowercased names
+        self._entries = {}    # lower -> [name, times_added, last_ts, active]
+        self._version = None
+        self._checked = 0.0
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked < SUGGEST_REFRESH_S:
+            return
+        self._checked = now
+        conn = get_conn()
+        version = shopping_list_version(conn)
+        if version == self._version:
+            return
+        entries = {}
+        for r in conn.execute("SELECT name, times_added, updated_at, active FROM shopping_list"):
+            name = (r["name"] or "").strip()
+            if name:
+                entries[name.lower()] = [name, r["times_added"] or 1, _parse_ts(r["updated_at"]), bool(r["active"])]
+        with self._lock:
+            self._entries = entries
+            self._keys = sorted(entries)
+            self._version = version
+
+    def note(self, name, active=True):
+        """Record an add/reactivation made by this process."""
+        name = (name or "").strip()
+        key = name.lower()
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = [name, 1, time.time(), active]
+                bisect.insort(self._keys, key)
+            else:
+                if active and not entry[3]:
+                    entry[1] += 1
+                entry[2], entry[3] = time.time(), active
 
-    with get_conn() as conn:
-        c = conn.cursor()
-        if q:
-            # 1️⃣ Names that start with query (highest priority)
-            c.execute("""
-                SELECT DISTINCT name
-                  FROM shopping_list
-                 WHERE LOWER(name) LIKE ?
-                 ORDER BY name
-                 LIMIT 10
-            """, (f"{q}%",))
-            start_matches = [r[0] for r in c.fetchall()]
-
-            # 2️⃣ Names that contain query (secondary)
-            remaining_slots = max(0, 10 - len(start_matches))
-            contain_matches = []
-            if remaining_slots > 0:
-                c.execute("""
-                    SELECT DISTINCT name
-                      FROM shopping_list
-                     WHERE LOWER(name) LIKE ?
-                       AND LOWER(name) NOT LIKE ?
-                     ORDER BY name
-                     LIMIT ?
-                """, (f"%{q}%", f"{q}%", remaining_slots))
-                contain_matches = [r[0] for r in c.fetchall()]
+    def _score(self, entry, now):
+        age_days = max(0.0, now - entry[2]) / 86400
+        return math.log1p(entry[1]) + 2.0 ** (-age_days / SUGGEST_HALF_LIFE_DAYS)
 
-            names = start_matches + contain_matches
+    def suggest(self, q, limit=SUGGEST_LIMIT):
+        self._maybe_refresh()
+        q = q.strip().lower()
+        now = time.time()
+        with self._lock:
+            keys, entries = self._keys, self._entries
+        if not q:
+            active = [e for e in entries.values() if e[3]]
+            return [e[0] for e in sorted(active, key=lambda e: e[0].lower())[:limit]]
 
-        else:
-            # Default: first few active names alphabetically
-            c.execute("""
-                SELECT DISTINCT name
-                  FROM shopping_list
-                 WHERE active = 1
-                 ORDER BY name
-                 LIMIT 10
-            """)
-            names = [r[0] for r in c.fetchall()]
+        # 1️⃣ prefix range via bisect (highest priority)
+        lo = bisect.bisect_left(keys, q)
+        hi = bisect.bisect_left(keys, q + "\uffff", lo)
+        starts = sorted((entries[k] for k in keys[lo:hi]), key=lambda e: -self._score(e, now))
+        names = [e[0] for e in starts[:limit]]
+
+        # 2️⃣ substring fallback, word starts before mid-word hits
+        if len(names) < limit:
+            contains = [entries[k] for k in keys if q in k and not k.startswith(q)]
+            contains.sort(key=lambda e: (f" {q}" not in f" {e[0].lower()}", -self._score(e, now)))
+            names += [e[0] for e in contains[:limit - len(names)]]
+        return names
 
-    return jsonify(names)
+
+suggestion_index = SuggestionIndex()
+
+
+@app.route("/api/shopping_list/suggestions")
+def api_shopping_list_suggestions():
+    """Return item names that begin with (or contain) the query, most-used first."""
+    q = request.args.get("q", "").strip().lower()
+    return jsonify(suggestion_index.suggest(q))
 
 
 
@@ -793,40 +4203,25 @@ def api_shopping_list_suggestions():
 @app.route("/api/selected")
 def api_selected():
     """Return recipe info + ingredients for given IDs (used by planner_v3)."""
-    import json
-
     ids = request.args.get("ids", "")
     if not ids:
         return {"meals": []}
 
-    id_list = [i for i in ids.split(",") if i.isdigit()]
+    id_list = [int(i) for i in ids.split(",") if i.isdigit()]
     if not id_list:
         return {"meals": []}
 
     with get_conn() as conn:
         c = conn.cursor()
-        q = f"SELECT id, name, ingredients, linked_recipe FROM recipes WHERE id IN ({','.join(['?'] * len(id_list))})"
+        q = f"SELECT id, name, linked_recipe FROM recipes WHERE id IN ({','.join(['?'] * len(id_list))})"
         c.execute(q, id_list)
         rows = c.fetchall()
+        # Ingredient lines were split + parsed at save time
+        lines = get_recipe_ingredients(conn, [r[0] for r in rows])
 
     meals = []
-    for rid, name, ing_text, linked_recipe in rows:
-        try:
-            if ing_text and ing_text.strip().startswith("["):
-                ingredients = json.loads(ing_text)
-                if isinstance(ingredients, str):
-                    ingredients = json.loads(ingredients)
-            else:
-                text = (ing_text or "").replace(",", "\n")
-                ingredients = [i.strip() for i in text.splitlines() if i.strip()]
-        except Exception:
-            text = (ing_text or "").replace(",", "\n").replace("[", "").replace("]", "").replace('"', "")
-            ingredients = [i.strip() for i in text.splitlines() if i.strip()]
-
-        if isinstance(ingredients, list):
-            ingredients = [str(i).strip() for i in ingredients]
-        else:
-            ingredients = [str(ingredients).strip()]
+    for rid, name, linked_recipe in rows:
+        ingredients = [r["raw"] for r in lines[rid]]
 
         # ✅ Prefer external link if available
         if linked_recipe and linked_recipe.startswith("http"):
@@ -843,6 +4238,32 @@ def api_selected():
 
     return {"meals": meals}
 
+@app.route("/api/selected/aggregate")
+def api_selected_aggregate():
+    """
+    One merged shopping list for the given recipe IDs, e.g. ?ids=4,9,9,12
+    (repeat an ID to plan a recipe twice). Compatible units are converted
+    and summed; every line keeps per-recipe provenance.
+    """
+    id_list = [int(i) for i in request.args.get("ids", "").split(",") if i.isdigit()]
+    if not id_list:
+        return {"meals": 0, "items": []}
+    multiplier = Counter(id_list)
+
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute(
+            f"SELECT id, name FROM recipes WHERE id IN ({','.join(['?'] * len(multiplier))})",
+            list(multiplier),
+        )
+        names = {r[0]: r[1] for r in c.fetchall()}
+        lines = get_recipe_ingredients(conn, names)
+
+    return {
+        "meals": sum(multiplier[rid] for rid in names),
+        "items": aggregate_ingredients(lines, names, multiplier),
+    }
+
 # === Shared Shopping List API ===
 
 # @app.route("/api/shopping_list", methods=["GET"])
@@ -933,9 +4354,103 @@ def feed_mealplan():
 
 from flask import jsonify
 
+# Every change to shopping_list bumps one counter (sync_state) and stamps the
+# changed row with it; deletes leave a tombstone. Triggers do this, so every
+# write path — single POST/PATCH/DELETE, clear, batch, plan apply — is covered.
+# The counter is the list's ETag and the cursor for ?since= deltas.
+def init_shopping_sync(conn):
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    c.execute("INSERT OR IGNORE INTO sync_state (name, version) VALUES ('shopping_list', 1)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS shopping_list_deleted (
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_shopping_list_version ON shopping_list(version)")
+
+    bump = "UPDATE sync_state SET version = version + 1 WHERE name = 'shopping_list';"
+    current = "(SELECT version FROM sync_state WHERE name = 'shopping_list')"
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS shopping_list_sync_ai AFTER INSERT ON shopping_list BEGIN
+            {bump}
+            UPDATE shopping_list SET version = {current} WHERE id = new.id;
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS shopping_list_sync_au
+        AFTER UPDATE OF name, category, amount, checked, crossed, active ON shopping_list BEGIN
+            {bump}
+            UPDATE shopping_list SET version = {current} WHERE id = new.id;
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS shopping_list_sync_ad AFTER DELETE ON shopping_list BEGIN
+            {bump}
+            INSERT OR REPLACE INTO shopping_list_deleted (id, version) VALUES (old.id, {current});
+        END
+    """)
+    # purchase frequency for suggestions: count every re-activation
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS shopping_list_times_added
+        AFTER UPDATE OF active ON shopping_list
+        WHEN new.active = 1 AND old.active = 0 BEGIN
+            UPDATE shopping_list SET times_added = times_added + 1 WHERE id = new.id;
+        END
+    """)
+    conn.commit()
+
+
+def _shopping_row(r):
+    return {
+        "id": r["id"],
+        "name": r["name"],
+        "category": r["category"] or "Other",
+        "amount": r["amount"] or "",
+        "crossed": bool(r["crossed"]),
+        "active": bool(r["active"]),
+    }
+
+
+def shopping_list_version(conn) -> int:
+    row = conn.execute("SELECT version FROM sync_state WHERE name = 'shopping_list'").fetchone()
+    return row[0] if row else 0
+
+
 @app.route("/api/shopping_list", methods=["GET"])
 def api_shopping_list_get():
-    with get_conn() as conn:
+    """
+    Active items (a JSON array), with a strong ETag of the list version.
+    If-None-Match → 304 without touching the list. ?since=<version> returns
+    {"version", "items", "deleted"} holding only rows changed after it
+    (deactivated rows included, so clients can drop them).
+    """
+    conn = get_conn()
+    version = shopping_list_version(conn)
+    etag = f"sl-{version}"
+    since = request.args.get("since", type=int)
+
+    if since is None and request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif since is not None:
+        c = conn.cursor()
+        c.execute("""
+            SELECT id, name, category, amount, crossed, active
+              FROM shopping_list
+             WHERE version > ?
+             ORDER BY category, name
+        """, (since,))
+        items = [_shopping_row(r) for r in c.fetchall()]
+        c.execute("SELECT id FROM shopping_list_deleted WHERE version > ?", (since,))
+        deleted = [r[0] for r in c.fetchall()]
+        response = jsonify({"version": version, "items": items, "deleted": deleted})
+    else:
         c = conn.cursor()
         c.execute("""
             SELECT id, name, category, amount, crossed, active
@@ -943,21 +4458,107 @@ def api_shopping_list_get():
             WHERE active = 1
             ORDER BY category, name
         """)
-        rows = c.fetchall()
+        items = [_shopping_row(r) for r in c.fetchall()]
+        response = jsonify(items)
+
+    response.set_etag(etag)
+    response.headers["X-List-Version"] = str(version)
+    response.headers["Cache-Control"] = "no-cache"   # always revalidate, 304 is cheap
+    return response
+
 
-    items = [
-        {
-            "id": r[0],
-            "name": r[1],
-            "category": r[2] or "Other",
-            "amount": r[3] or "",
-            "crossed": bool(r[4]),
-            "active": bool(r[5])
-        }
-        for r in rows
-    ]
-    return jsonify(items)
 
+# ============================================================
+#  📡 Live updates (Server-Sent Events)
+# ============================================================
+# Each process runs one watcher thread that polls the list version in SQLite
+# (a single-row read) and wakes that process's streams when it moves. Writes
+# from any worker bump the same counter, so fan-out works across processes
+# with nothing but the DB file. Event ids are list versions, so a reconnecting
+# EventSource resumes from Last-Event-ID via the same rows ?since= uses.
+SSE_POLL_INTERVAL = 0.5
+SSE_HEARTBEAT = 15
+
+
+class ChangeNotifier:
+    def __init__(self, interval=SSE_POLL_INTERVAL):
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._version = None
+        self._thread = None
+
+    def _ensure_started(self):
+        # started lazily so it lives in the serving process, not a pre-fork parent
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="list-watcher", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        conn = connect_db()
+        while True:
+            try:
+                version = shopping_list_version(conn)
+            except sqlite3.Error as e:
+                print("⚠️ list watcher:", e)
+                version = self._version
+            if version != self._version:
+                with self._cond:
+                    self._version = version
+                    self._cond.notify_all()
+            time.sleep(self.interval)
+
+    def wait(self, seen, timeout):
+        """Block until the version moves past `seen`; returns it (or `seen` on timeout)."""
+        self._ensure_started()
+        with self._cond:
+            if self._cond.wait_for(lambda: self._version is not None and self._version > seen, timeout):
+                return self._version
+            return seen
+
+
+list_notifier = ChangeNotifier()
+
+
+def shopping_list_changes(conn, since):
+    """[(version, event, payload)] for every row/tombstone changed after `since`."""
+    c = conn.cursor()
+    c.execute("""
+        SELECT id, name, category, amount, crossed, active, version
+          FROM shopping_list
+         WHERE version > ?
+    """, (since,))
+    changes = [(r["version"], "item", _shopping_row(r)) for r in c.fetchall()]
+    c.execute("SELECT id, version FROM shopping_list_deleted WHERE version > ?", (since,))
+    changes += [(r["version"], "delete", {"id": r["id"]}) for r in c.fetchall()]
+    return sorted(changes, key=lambda ch: ch[0])
+
+
+@app.route("/api/shopping_list/stream")
+def api_shopping_list_stream():
+    """Push item-level changes; resumes from Last-Event-ID (or ?since=)."""
+    resume = request.headers.get("Last-Event-ID") or request.args.get("since")
+    since = int(resume) if resume and resume.isdigit() else None
+
+    def events():
+        conn = connect_db()   # own connection: outlives the request context
+        try:
+            last = shopping_list_version(conn) if since is None else since
+            yield f"retry: 3000\nid: {last}\nevent: hello\ndata: {json.dumps({'version': last})}\n\n"
+            while True:
+                for version, event, payload in shopping_list_changes(conn, last):
+                    yield f"id: {version}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+                    last = max(last, version)
+                if list_notifier.wait(last, SSE_HEARTBEAT) == last:
+                    yield ": ping\n\n"
+        finally:
+            conn.close()
+
+    return app.response_class(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 
 # ============================================================
@@ -1002,6 +4603,7 @@ def api_shopping_list_post():
                  WHERE id = ?
             """, (category or prev_cat, now, existing_id))
             conn.commit()
+            suggestion_index.note(name)
             return jsonify({
                 "id": existing_id,
                 "name": name,
@@ -1015,6 +4617,7 @@ def api_shopping_list_post():
         """, (name, category, now))
         conn.commit()
         new_id = c.lastrowid
+        suggestion_index.note(name)
 
     return jsonify({"id": new_id, "name": name, "category": category})
 
@@ -1078,19 +4681,238 @@ def api_shopping_list_delete(item_id):
 def api_shopping_list_clear():
     with get_conn() as conn:
         c = conn.cursor()
-        c.execute("UPDATE shopping_list SET active = 0")
+        c.execute("UPDATE shopping_list SET active = 0 WHERE active = 1")
         conn.commit()
     return jsonify({"status": "cleared"})
 
 
+# ============================================================
+#  📦 Batch add / update / delete (one round trip, one commit)
+# ============================================================
+SHOPPING_BATCH_MAX = 500
+SHOPPING_FIELDS = ("category", "amount", "crossed", "active")
+
+
+@app.route("/api/shopping_list/batch", methods=["POST"])
+def api_shopping_list_batch():
+    """
+    Apply a list of operations atomically:
+      {"op": "add", "name": "penne", "category": "Pantry", "amount": "500 g"}
+      {"op": "update", "id": 12, "crossed": true}
+      {"op": "delete", "id": 12}
+    Body is either that list or {"ops": [...]}. Adds are UPSERTs on the
+    unique name (case-insensitive, existing category kept unless given).
+    Returns the resulting rows for every added/updated item.
+    """
+    data = request.get_json(force=True)
+    ops = data.get("ops") if isinstance(data, dict) else data
+    if not isinstance(ops, list):
+        return jsonify({"error": "Expected a list of operations"}), 400
+    if len(ops) > SHOPPING_BATCH_MAX:
+        return jsonify({"error": f"At most {SHOPPING_BATCH_MAX} operations per batch"}), 400
+
+    now = datetime.now().isoformat(timespec="seconds")
+    conn = get_conn()
+    c = conn.cursor()
+
+    # Map every name being added onto the spelling already stored, so
+    # "Milk" reactivates "milk" instead of tripping the UNIQUE constraint.
+    add_names = {(op.get("name") or "").strip().lower()
+                 for op in ops if isinstance(op, dict) and op.get("op") == "add"}
+    add_names.discard("")
+    stored = {}
+    if add_names:
+        c.execute(f"""
+            SELECT id, name FROM shopping_list
+             WHERE LOWER(name) IN ({','.join(['?'] * len(add_names))})
+        """, list(add_names))
+        stored = {r["name"].lower(): r["name"] for r in c.fetchall()}
+
+    touched_names, touched_ids, deleted = [], [], []
+    try:
+        for i, op in enumerate(ops):
+            kind = op.get("op") if isinstance(op, dict) else None
+
+            if kind == "add":
+                name = (op.get("name") or "").strip()
+                if not name:
+                    raise ValueError(f"op {i}: missing item name")
+                name = stored.setdefault(name.lower(), name)
+                c.execute("""
+                    INSERT INTO shopping_list (name, category, amount, active, updated_at)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        active = 1,
+                        category = COALESCE(excluded.category, shopping_list.category),
+                        amount = COALESCE(excluded.amount, shopping_list.amount),
+                        updated_at = excluded.updated_at
+                """, (name, op.get("category") or None, op.get("amount"), now))
+                touched_names.append(name)
+
+            elif kind == "update":
+                item_id = int(op.get("id"))
+                fields = [f for f in SHOPPING_FIELDS if f in op]
+                if not fields:
+                    raise ValueError(f"op {i}: update needs at least one field")
+                values = [int(op[f]) if f in ("crossed", "active") else op[f] for f in fields]
+                c.execute(f"""
+                    UPDATE shopping_list
+                       SET {", ".join(f"{f} = ?" for f in fields)}, updated_at = ?
+                     WHERE id = ?
+                """, (*values, now, item_id))
+                touched_ids.append(item_id)
+
+            elif kind == "delete":
+                item_id = int(op.get("id"))
+                c.execute("DELETE FROM shopping_list WHERE id = ?", (item_id,))
+                deleted.append(item_id)
+
+            else:
+                raise ValueError(f"op {i}: unknown op {kind!r}")
+    except (ValueError, TypeError, sqlite3.IntegrityError) as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    conn.commit()
+    for name in touched_names:
+        suggestion_index.note(name)
+
+    rows = []
+    if touched_names or touched_ids:
+        c.execute(f"""
+            SELECT id, name, category, amount, crossed, active
+              FROM shopping_list
+             WHERE name IN ({','.join(['?'] * len(touched_names)) or "NULL"})
+                OR id IN ({','.join(['?'] * len(touched_ids)) or "NULL"})
+             ORDER BY category, name
+        """, (*touched_names, *touched_ids))
+        rows = [_shopping_row(r) for r in c.fetchall()]
+
+    return jsonify({"status": "ok", "items": rows, "deleted": deleted})
+
+
 
 # === PLANNER SAVE / LOAD / LIST ===
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import sqlite3, json
+import hashlib
+import zlib
 from flask import request, jsonify
 
+# Snapshots are split in two:
+#   planner_saves       — small metadata rows (name, created, summary columns,
+#                         content_hash); the list view reads only these.
+#   planner_save_blobs  — zlib-compressed JSON, one row per distinct content.
+# The legacy `data` column is kept (NOT NULL) but left empty.
+# Retention: everything from the last PLANNER_KEEP_ALL_DAYS, then the newest
+# save per day up to PLANNER_KEEP_DAILY_DAYS, then the newest per week.
+# Only autosaves ("Plan dd-mm-yyyy hh:mm") are thinned; named plans stay.
+PLANNER_KEEP_ALL_DAYS = 14
+PLANNER_KEEP_DAILY_DAYS = 90
+PLANNER_ZLIB_LEVEL = 6
+PLAN_STREAM_CHUNK = 64 * 1024
+AUTOSAVE_NAME_RE = re.compile(r"Plan \d{2}-\d{2}-\d{4}( \d{2}:\d{2})?")
+
+
+def _plan_summary(plan):
+    """(meal_count, item_count, recipe_ids_json) for a planner payload."""
+    if not isinstance(plan, dict):
+        return 0, 0, "[]"
+    items = plan.get("shoppingList") or plan.get("shopping_list") or []
+    recipes = plan.get("recipes") or []
+    ids = []
+    for r in recipes:
+        rid = r.get("id") if isinstance(r, dict) else r
+        if str(rid).isdigit():
+            ids.append(int(rid))
+    return len(recipes), len(items), json.dumps(ids)
+
+
+def plan_content_hash(plan):
+    """Hash of the plan's content; the client's save timestamp doesn't count."""
+    if isinstance(plan, dict):
+        plan = {k: v for k, v in plan.items() if k != "timestamp"}
+    canonical = json.dumps(plan, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _store_plan_blob(conn, digest, raw: bytes):
+    conn.execute(
+        "INSERT OR IGNORE INTO planner_save_blobs (hash, raw_size, data) VALUES (?, ?, ?)",
+        (digest, len(raw), zlib.compress(raw, PLANNER_ZLIB_LEVEL)),
+    )
+
+
+def _migrate_planner_saves(conn):
+    """Move legacy inline JSON into compressed blobs (once per row)."""
+    rows = conn.execute(
+        "SELECT id, data FROM planner_saves WHERE content_hash IS NULL"
+    ).fetchall()
+    for rid, data in rows:
+        try:
+            plan = json.loads(data)
+            digest = plan_content_hash(plan)
+        except ValueError:
+            plan, digest = None, hashlib.sha256(data.encode("utf-8")).hexdigest()
+        meals, items, ids = _plan_summary(plan)
+        _store_plan_blob(conn, digest, data.encode("utf-8"))
+        conn.execute("""
+            UPDATE planner_saves
+               SET data = '', content_hash = ?, meal_count = ?, item_count = ?, recipe_ids = ?
+             WHERE id = ?
+        """, (digest, meals, items, ids, rid))
+    if rows:
+        print(f"🗜️ Compressed {len(rows)} saved plans.")
+
+
+def thin_planner_saves(conn, now=None):
+    """Apply the retention policy; returns how many snapshots were dropped."""
+    now = now or datetime.now(timezone.utc)
+    keep_all = (now - timedelta(days=PLANNER_KEEP_ALL_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    daily = (now - timedelta(days=PLANNER_KEEP_DAILY_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    rows = conn.execute(
+        "SELECT id, name, created FROM planner_saves WHERE created < ? ORDER BY created DESC, id DESC",
+        (keep_all,),
+    ).fetchall()
+
+    seen, drop = set(), []
+    for rid, name, created in rows:
+        if not AUTOSAVE_NAME_RE.fullmatch(name or ""):
+            continue
+        try:
+            ts = datetime.fromisoformat(str(created))
+        except ValueError:
+            continue
+        bucket = ts.date() if str(created) >= daily else tuple(ts.isocalendar()[:2])
+        if bucket in seen:
+            drop.append((rid,))
+        else:
+            seen.add(bucket)
+
+    if drop:
+        conn.executemany("DELETE FROM planner_saves WHERE id = ?", drop)
+        conn.execute("""
+            DELETE FROM planner_save_blobs
+             WHERE hash NOT IN (SELECT content_hash FROM planner_saves WHERE content_hash IS NOT NULL)
+        """)
+    return len(drop)
+
+
+def load_planner_save(conn, plan_id):
+    """Decoded plan dict, or None if there is no such save. ValueError on bad JSON."""
+    row = conn.execute("""
+        SELECT b.data
+          FROM planner_saves s
+          JOIN planner_save_blobs b ON b.hash = s.content_hash
+         WHERE s.id = ?
+    """, (plan_id,)).fetchone()
+    if not row:
+        return None
+    return json.loads(zlib.decompress(row[0]))
+
+
 def init_planner_table():
-    conn = sqlite3.connect("recipes_v2.db")
+    conn = get_conn()
     c = conn.cursor()
     c.execute("""
         CREATE TABLE IF NOT EXISTS planner_saves (
@@ -1100,10 +4922,28 @@ def init_planner_table():
             created TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    c.execute("PRAGMA table_info(planner_saves)")
+    cols = [r[1] for r in c.fetchall()]
+    for col, ddl in [
+        ("content_hash", "ALTER TABLE planner_saves ADD COLUMN content_hash TEXT"),
+        ("meal_count", "ALTER TABLE planner_saves ADD COLUMN meal_count INTEGER NOT NULL DEFAULT 0"),
+        ("item_count", "ALTER TABLE planner_saves ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0"),
+        ("recipe_ids", "ALTER TABLE planner_saves ADD COLUMN recipe_ids TEXT NOT NULL DEFAULT '[]'"),
+    ]:
+        if col not in cols:
+            c.execute(ddl)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS planner_save_blobs (
+            hash TEXT PRIMARY KEY,
+            raw_size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    _migrate_planner_saves(conn)
     conn.commit()
-    conn.close()
 
 init_planner_table()
+init_db()   # cheap when up to date; builds search/tag indexes on first run
 
 
 # --- SAVE current planner snapshot ---
@@ -1111,19 +4951,34 @@ init_planner_table()
 def api_planner_save():
     payload = request.get_json(force=True)
 
-    # ✅ Set plan name with European-style DD-MM-YYYY format
+    # ✅ Set plan name with European-style DD-MM-YYYY format (see AUTOSAVE_NAME_RE)
     plan_name = payload.get("name") or f"Plan {datetime.now():%d-%m-%Y %H:%M}"
 
     # ✅ Capture entire payload if "plan" key missing
     plan_json = payload.get("plan") or payload
-    plan_data = json.dumps(plan_json)
+    raw = json.dumps(plan_json).encode("utf-8")
+    digest = plan_content_hash(plan_json)
+    meals, items, recipe_ids = _plan_summary(plan_json)
 
-    conn = sqlite3.connect("recipes_v2.db")
+    conn = get_conn()
     c = conn.cursor()
-    c.execute("INSERT INTO planner_saves (name, data) VALUES (?, ?)", (plan_name, plan_data))
-    conn.commit()
+
+    # ✅ Same content as the latest save → keep that snapshot, unless this save
+    # gives it a new name (the new row then shares the existing blob)
+    c.execute("SELECT id, name, content_hash FROM planner_saves ORDER BY id DESC LIMIT 1")
+    last = c.fetchone()
+    if last and last["content_hash"] == digest and (
+            not payload.get("name") or payload["name"] == last["name"]):
+        return jsonify({"status": "ok", "id": last["id"], "name": last["name"], "deduplicated": True})
+
+    _store_plan_blob(conn, digest, raw)
+    c.execute("""
+        INSERT INTO planner_saves (name, data, content_hash, meal_count, item_count, recipe_ids)
+        VALUES (?, '', ?, ?, ?, ?)
+    """, (plan_name, digest, meals, items, recipe_ids))
     plan_id = c.lastrowid
-    conn.close()
+    thin_planner_saves(conn)
+    conn.commit()
 
     return jsonify({"status": "ok", "id": plan_id, "name": plan_name})
 
@@ -1132,82 +4987,210 @@ def api_planner_save():
 # --- LIST all saved plans ---
 @app.route("/api/planner/list")
 def api_planner_list():
-    conn = sqlite3.connect("recipes_v2.db")
+    conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT id, name, created FROM planner_saves ORDER BY created DESC")
-    rows = [{"id": r[0], "name": r[1], "created": r[2]} for r in c.fetchall()]
-    conn.close()
+    # metadata only — the blobs live in planner_save_blobs
+    c.execute("""
+        SELECT id, name, created, meal_count, item_count, recipe_ids
+          FROM planner_saves
+         ORDER BY created DESC
+    """)
+    rows = [{
+        "id": r[0], "name": r[1], "created": r[2],
+        "meals": r[3], "items": r[4], "recipe_ids": json.loads(r[5] or "[]"),
+    } for r in c.fetchall()]
     return jsonify(rows)
 
 
 # --- LOAD a specific plan ---
 @app.route("/api/planner/load/<int:plan_id>")
 def api_planner_load(plan_id):
-    conn = sqlite3.connect("recipes_v2.db")
+    conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT data FROM planner_saves WHERE id=?", (plan_id,))
+    c.execute("""
+        SELECT b.data
+          FROM planner_saves s
+          JOIN planner_save_blobs b ON b.hash = s.content_hash
+         WHERE s.id = ?
+    """, (plan_id,))
     row = c.fetchone()
-    conn.close()
 
     if not row:
         return jsonify({"error": "Plan not found"}), 404
 
-    try:
-        return jsonify(json.loads(row[0]))
-    except Exception as e:
-        return jsonify({"error": f"Invalid JSON: {e}"}), 500
+    def decompress(blob):
+        # stored JSON is sent as-is, inflated PLAN_STREAM_CHUNK bytes at a time
+        d = zlib.decompressobj()
+        data = blob
+        while data:
+            out = d.decompress(data, PLAN_STREAM_CHUNK)
+            if out:
+                yield out
+            data = d.unconsumed_tail
+        tail = d.flush()
+        if tail:
+            yield tail
+
+    return app.response_class(decompress(bytes(row[0])), mimetype="application/json")
 
 # --- APPLY a saved plan to the live shopping_list table ---
 @app.route("/api/planner/apply/<int:plan_id>", methods=["POST"])
 def api_planner_apply(plan_id):
-    """Replace current shopping_list table with the one from the saved plan."""
-    import json, sqlite3
-
-    conn = sqlite3.connect("recipes_v2.db")
+    """
+    Make the live list match the saved plan's items (uncrossed, amounts
+    cleared), writing only the rows that differ. Existing rows keep their
+    ids and remembered category; items not in the plan are deactivated.
+    Returns the diff in the same shape as GET /api/shopping_list?since=,
+    plus base_version so a client holding exactly that version can patch
+    its copy instead of refetching.
+    """
+    conn = get_conn()
     c = conn.cursor()
 
     # --- 1️⃣ Load saved plan data ---
-    c.execute("SELECT data FROM planner_saves WHERE id=?", (plan_id,))
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return jsonify({"error": "Plan not found"}), 404
-
     try:
-        plan_data = json.loads(row[0])
+        plan_data = load_planner_save(conn, plan_id)
+        if plan_data is None:
+            return jsonify({"error": "Plan not found"}), 404
         shopping_list = plan_data.get("shoppingList") or plan_data.get("shopping_list") or []
     except Exception as e:
-        conn.close()
         return jsonify({"error": f"Invalid JSON: {e}"}), 500
 
-    # --- 2️⃣ Clear current list ---
-    c.execute("UPDATE shopping_list SET active = 0")
-
-    # --- 3️⃣ Insert all items from saved plan, reset 'crossed' + clear 'amount' ---
+    # last entry wins for names repeated in the plan
+    wanted = {}
     for item in shopping_list:
-        name = item.get("name", "").strip()
-        if not name:
-            continue
-        category = item.get("category") or "Other"
-        crossed = 0   # reset all to uncrossed
-        amount = ""   # ✅ clear units for a fresh start
+        name = (item.get("name") or "").strip() if isinstance(item, dict) else ""
+        if name:
+            wanted[name.lower()] = (name, item.get("category") or None)
 
-        c.execute("""
-            INSERT OR REPLACE INTO shopping_list (name, category, amount, crossed, active, updated_at)
-            VALUES (?, ?, ?, ?, 1, datetime('now'))
-        """, (name, category, amount, crossed))
+    now = datetime.now().isoformat(timespec="seconds")
+    if not conn.in_transaction:
+        c.execute("BEGIN IMMEDIATE")   # diff and write against the same snapshot
+    try:
+        base_version = shopping_list_version(conn)
+        c.execute("SELECT id, name, category, amount, crossed, active FROM shopping_list")
+        current = {r["name"].lower(): r for r in c.fetchall()}
+
+        # --- 2️⃣ Diff: rows to insert / reset, active rows to drop ---
+        upserts, added, updated, unchanged = [], [], [], 0
+        for key, (name, category) in wanted.items():
+            row = current.get(key)
+            if row is None:
+                upserts.append((name, category or "Other", now))
+                added.append(name)
+                continue
+            category = category or row["category"] or "Other"
+            if row["active"] and not row["crossed"] and not row["amount"] and row["category"] == category:
+                unchanged += 1
+                continue
+            upserts.append((row["name"], category, now))
+            updated.append(row["name"])
+        removed = [(now, r["id"]) for key, r in current.items() if r["active"] and key not in wanted]
+
+        # --- 3️⃣ One UPSERT pass (ids preserved) + one deactivate pass ---
+        c.executemany("""
+            INSERT INTO shopping_list (name, category, amount, crossed, active, updated_at)
+            VALUES (?, ?, '', 0, 1, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                category = excluded.category,
+                amount = '',
+                crossed = 0,
+                active = 1,
+                updated_at = excluded.updated_at
+        """, upserts)
+        c.executemany("UPDATE shopping_list SET active = 0, updated_at = ? WHERE id = ?", removed)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    for name in added + updated:
+        suggestion_index.note(name)
+
+    touched = added + updated
+    changed_ids = [rid for _, rid in removed]
+    rows = []
+    if touched or changed_ids:
+        c.execute(f"""
+            SELECT id, name, category, amount, crossed, active
+              FROM shopping_list
+             WHERE name IN ({','.join(['?'] * len(touched)) or "NULL"})
+                OR id IN ({','.join(['?'] * len(changed_ids)) or "NULL"})
+        """, (*touched, *changed_ids))
+        rows = [_shopping_row(r) for r in c.fetchall()]
+
+    return jsonify({
+        "status": "applied",
+        "count": len(wanted),
+        "base_version": base_version,
+        "version": shopping_list_version(conn),
+        "items": rows,
+        "deleted": [],
+        "diff": {
+            "added": added,
+            "updated": updated,
+            "removed": changed_ids,
+            "unchanged": unchanged,
+        },
+    })
 
-    conn.commit()
-    conn.close()
 
-    return jsonify({"status": "applied", "count": len(shopping_list)})
+# ---------------------------
+# Production server (gunicorn)
+# ---------------------------
+#   gunicorn -c gunicorn.conf.py app:app
+# gunicorn.conf.py preloads this module in the master and calls the two
+# hooks below: warm_master() once before the first fork, so spaCy,
+# tags.json, the recipe vectors, the trigram index and the asset manifest
+# are shared copy-on-write by every worker (gc.freeze() keeps the collector
+# from writing to those pages), and after_fork() in each new worker.
+def warm_master():
+    """Load everything workers would otherwise each load on first use."""
+    t0 = time.perf_counter()
+    tag_config.get()
+    try:
+        get_nlp()
+    except Exception as e:
+        print("⚠️ spaCy preload failed:", e)
+    conn = connect_db()
+    try:
+        recipe_vectors.ensure_loaded(conn)
+        trigram_index.current(conn)
+    finally:
+        conn.close()
+    load_assets()
+    # no SQLite handle may cross the fork
+    for conn in (g.pop("_database", None) if has_app_context() else None,
+                 getattr(_local, "conn", None)):
+        if conn is not None:
+            conn.close()
+    _local.conn = None
+    gc.collect()
+    gc.freeze()
+    print(f"🔥 Master warmed in {time.perf_counter() - t0:.1f}s", flush=True)
+
+
+def after_fork():
+    """Per worker: fresh SQLite handles, cold-start timing, the similar-recipes drain."""
+    global _forked
+    _local.conn = None   # opened again on first use, in this process
+    _forked = True       # first_response_s counts from this worker's first request
+    STARTUP_TIMINGS.pop("first_response_s", None)
+    similar_worker.start_thread()   # only the lease holder drains
 
 
 # ---------------------------
 # Entrypoint
 # ---------------------------
 if __name__ == "__main__":
+    # development server (debugger + reloader); production: gunicorn -c gunicorn.conf.py app:app
     init_db()
+    # SPACY_PRELOAD=1 warms spaCy in the background once the server is up
+    # (only in the reloader's serving child, not the file-watching parent).
+    if os.environ.get("SPACY_PRELOAD") == "1" and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_nlp_preload()
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        similar_worker.start_thread()
     app.run(debug=True, port=5050, host="0.0.0.0")
 
 
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the recipe app on synthetic collections.
+
+    python -m bench run --sizes 1000,10000,100000
+    python -m bench compare bench/results/baseline.json bench/results/latest.json
+
+See corpus.py (synthetic recipes_v2.db copies) and runner.py (route timings).
+"""
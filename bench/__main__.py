@@ -0,0 +1,178 @@
+"""
+Command line for the benchmark suite.
+
+    python -m bench run [--sizes 1000,10000,100000] [--iterations 50] [--baseline FILE]
+    python -m bench compare BASELINE CURRENT [--threshold 1.25]
+    python -m bench generate --size 10000 [--out PATH]
+
+Corpora are cached under bench/data/ (rebuilt with --regenerate); each size
+is timed on a throwaway copy in a separate interpreter.
+"""
+import argparse
+import json
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from .corpus import ROOT, generate_corpus
+
+BENCH_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCH_DIR / "data"
+RESULTS_DIR = BENCH_DIR / "results"
+DEFAULT_SIZES = "1000,10000,100000"
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "queries")
+
+
+def corpus_path(size, seed, regenerate=False):
+    path = DATA_DIR / f"recipes_{size}_s{seed}.db"
+    if regenerate or not path.exists():
+        print(f"🧪 Generating {size} recipes → {path.relative_to(ROOT)}", flush=True)
+        generate_corpus(path, size, seed=seed)
+    return path
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args):
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = {
+        "meta": {
+            "when": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "sizes": {},
+    }
+    for size in sizes:
+        source = corpus_path(size, args.seed, args.regenerate)
+        with tempfile.TemporaryDirectory(prefix="recipes-bench-") as tmp:
+            db = Path(tmp) / source.name
+            shutil.copyfile(source, db)
+            out = Path(tmp) / "result.json"
+            cmd = [sys.executable, "-m", "bench", "measure", "--db", str(db), "--out", str(out),
+                   "--iterations", str(args.iterations), "--seed", str(args.seed)]
+            if args.semantic:
+                cmd.append("--semantic")
+            for o in args.only or ():
+                cmd += ["--only", o]
+            print(f"⏱️ {size} recipes", flush=True)
+            subprocess.run(cmd, cwd=ROOT, check=True)
+            report["sizes"][str(size)] = json.loads(out.read_text())
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"✅ Results written to {out}")
+    if args.baseline:
+        return compare(json.loads(Path(args.baseline).read_text()), report, args.threshold)
+    return 0
+
+
+def cmd_measure(args):
+    from .runner import measure
+    result = measure(args.db, iterations=args.iterations, seed=args.seed,
+                     semantic=args.semantic, only=args.only)
+    Path(args.out).write_text(json.dumps(result))
+    print(f"  startup {result['startup_s']}s, peak RSS {result['peak_rss_mb']} MB")
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """Print per-route ratios; non-zero exit when any metric grew past `threshold`×."""
+    regressions = 0
+    for size, cur in current["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if not base:
+            print(f"— {size}: not in baseline")
+            continue
+        print(f"📊 {size} recipes (peak RSS {base['peak_rss_mb']} → {cur['peak_rss_mb']} MB)")
+        for label, r in cur["routes"].items():
+            b = base["routes"].get(label)
+            if not b:
+                print(f"  {label:<38} new")
+                continue
+            cells = []
+            for m in METRICS:
+                ratio = r[m] / b[m] if b[m] else (1.0 if not r[m] else float("inf"))
+                flag = ""
+                # sub-millisecond jitter is noise, not a regression
+                if ratio > threshold and (m == "queries" or r[m] - b[m] > 1.0):
+                    flag = " ❗"
+                    regressions += 1
+                cells.append(f"{m.split('_')[0]} {b[m]}→{r[m]} ({ratio:.2f}x){flag}")
+            print(f"  {label:<38} " + "  ".join(cells))
+    print(f"{'❌' if regressions else '✅'} {regressions} regression(s) over {threshold}x")
+    return 1 if regressions else 0
+
+
+def cmd_compare(args):
+    return compare(json.loads(Path(args.baseline).read_text()),
+                   json.loads(Path(args.current).read_text()), args.threshold)
+
+
+def cmd_generate(args):
+    if args.out:
+        generate_corpus(args.out, args.size, seed=args.seed)
+    else:
+        corpus_path(args.size, args.seed, regenerate=True)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="generate corpora as needed and time every route")
+    p.add_argument("--sizes", default=DEFAULT_SIZES)
+    p.add_argument("--iterations", type=int, default=50)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--semantic", action="store_true", help="include mode=semantic search (needs the spaCy model)")
+    p.add_argument("--only", action="append", help="only routes whose label contains this (repeatable)")
+    p.add_argument("--regenerate", action="store_true")
+    p.add_argument("--out")
+    p.add_argument("--baseline", help="compare against this results file afterwards")
+    p.add_argument("--threshold", type=float, default=1.25)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("measure", help=argparse.SUPPRESS)
+    p.add_argument("--db", required=True)
+    p.add_argument("--out", required=True)
+    p.add_argument("--iterations", type=int, default=50)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--semantic", action="store_true")
+    p.add_argument("--only", action="append")
+    p.set_defaults(func=cmd_measure)
+
+    p = sub.add_parser("compare", help="compare two results files")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=1.25)
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("generate", help="(re)build one synthetic corpus")
+    p.add_argument("--size", type=int, required=True)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out")
+    p.set_defaults(func=cmd_generate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
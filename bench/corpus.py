@@ -0,0 +1,153 @@
+"""
+Synthetic recipes_v2.db copies at a chosen size.
+
+The schema comes from the real database next to app.py, and the vocabulary
+(ingredient names, tags) from that database and tags.json, so the generated
+rows look like ours: JSON ingredient lists with amounts and units, lowercase
+tag lists, planner saves shaped like the ones planner.js posts.
+"""
+import json
+import random
+import sqlite3
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DB = ROOT / "recipes_v2.db"
+TAGS_JSON = ROOT / "tags.json"
+
+UNITS = ["g", "g", "g", "kg", "ml", "ml", "l", "tsp", "tbsp", "tbsp", "cup",
+         "oz", "lb", "clove", "cloves", "can", "pack", ""]
+FALLBACK_ITEMS = ["onion", "garlic", "chicken thighs", "penne", "chopped tomatoes",
+                  "olive oil", "salt", "black pepper", "basil", "cheddar", "rice",
+                  "coconut milk", "curry paste", "spinach", "lemon", "butter"]
+ADJECTIVES = ["Smoky", "Crispy", "Slow-cooked", "Lemony", "Spiced", "Creamy",
+              "Quick", "Roasted", "Sticky", "Herby", "Garlicky", "Easy"]
+DISHES = ["Traybake", "Stew", "Pasta", "Curry", "Salad", "Soup", "Pie", "Stir-fry",
+          "Bake", "Risotto", "Tacos", "Noodles", "Skewers", "Gratin"]
+CATEGORIES = ["Produce", "Meat", "Dairy", "Pantry", "Frozen", "Bakery", "Other"]
+METHOD_STEPS = [
+    "Heat the oil in a large pan over a medium heat.",
+    "Add the {a} and cook for 5 minutes until softened.",
+    "Stir in the {b} and season well.",
+    "Simmer for 20 minutes, stirring now and then.",
+    "Roast at 200C for 25-30 minutes until golden.",
+    "Scatter over the {a} and serve straight away.",
+]
+
+
+def _source_vocabulary():
+    """Ingredient names from the real recipes, tags from tags.json."""
+    items = set()
+    if SOURCE_DB.exists():
+        conn = sqlite3.connect(SOURCE_DB)
+        for (raw,) in conn.execute("SELECT ingredients FROM recipes"):
+            try:
+                values = json.loads(raw) if raw and raw.strip().startswith("[") else (raw or "").split("\n")
+            except ValueError:
+                values = (raw or "").split("\n")
+            items.update(str(v).strip().lower() for v in values if str(v).strip())
+        conn.close()
+    try:
+        groups = json.loads(TAGS_JSON.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        groups = {}
+    tags = sorted({t.lower() for values in groups.values() for t in values}) or ["main", "quick"]
+    return sorted(items) or FALLBACK_ITEMS, tags
+
+
+def _amount(rng):
+    return rng.choice(["1", "2", "3", "4", "1/2", "1 1/2", "200", "400", "250", "0.5", "½"])
+
+
+def _ingredient_lines(rng, items):
+    lines = []
+    for item in rng.sample(items, k=min(len(items), rng.randint(4, 14))):
+        unit = rng.choice(UNITS)
+        lines.append(item if rng.random() < 0.2 else " ".join(p for p in (_amount(rng), unit, item) if p))
+    return lines
+
+
+def _recipe(rng, items, tags, n):
+    lines = _ingredient_lines(rng, items)
+    main = lines[0].split()[-1].title()
+    steps = [s.format(a=rng.choice(items), b=rng.choice(items))
+             for s in rng.sample(METHOD_STEPS, k=rng.randint(2, len(METHOD_STEPS)))]
+    return (
+        f"{rng.choice(ADJECTIVES)} {main} {rng.choice(DISHES)} {n}",
+        json.dumps(lines),
+        "\n".join(steps),
+        json.dumps(rng.sample(tags, k=rng.randint(1, 4))),
+        f"/static/images/bench_{n % 50}.jpg" if rng.random() < 0.6 else None,
+        rng.choice(["", "", "Freezes well.", "Double the sauce."]),
+    )
+
+
+def _planner_save(rng, items, recipe_count, n):
+    shopping = [{"id": i + 1, "name": name, "category": rng.choice(CATEGORIES),
+                 "amount": "", "crossed": rng.random() < 0.3}
+                for i, name in enumerate(rng.sample(items, k=min(len(items), rng.randint(10, 40))))]
+    picked = [{"id": rng.randint(1, recipe_count), "name": f"Recipe {n}"} for _ in range(rng.randint(3, 10))]
+    grid = "".join(f'<div class="meal-slot" data-slot="d{d}">Recipe {rng.randint(1, recipe_count)}</div>'
+                   for d in range(14))
+    return (f"Plan {n}", json.dumps({"timestamp": "2025-11-04T18:00:00Z", "shopping_list": shopping,
+                                     "recipes": picked, "meal_plan": grid}))
+
+
+def generate_corpus(path, size, seed=0):
+    """
+    Write a `size`-recipe database to `path` (overwritten). Derived tables
+    (FTS, tags, parsed ingredients) are left for app.init_db() to build,
+    exactly as on a first start against a new database.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+
+    rng = random.Random(seed)
+    items, tags = _source_vocabulary()
+
+    conn = sqlite3.connect(path)
+    if SOURCE_DB.exists():
+        # base tables only; the app recreates its own indexes and triggers
+        src = sqlite3.connect(SOURCE_DB)
+        for name, sql in src.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND sql IS NOT NULL"
+            " AND name IN ('recipes', 'shopping_list', 'planner_saves', 'meal_plan')"
+        ):
+            conn.execute(sql)
+        src.close()
+    conn.execute("""CREATE TABLE IF NOT EXISTS recipes (id INTEGER PRIMARY KEY, name TEXT,
+        ingredients JSON, method TEXT, tags JSON, category TEXT, source TEXT, linked_recipe TEXT,
+        image_url TEXT, notes TEXT, created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS planner_saves (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL, data TEXT NOT NULL, created TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS meal_plan (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        slot TEXT, recipe TEXT, link TEXT, updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS shopping_list (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE, category TEXT, amount TEXT, checked INTEGER DEFAULT 1,
+        crossed INTEGER DEFAULT 0, active INTEGER DEFAULT 1, updated_at TIMESTAMP)""")
+
+    chunk = 5000
+    for start in range(0, size, chunk):
+        conn.executemany(
+            "INSERT INTO recipes (name, ingredients, method, tags, image_url, notes) VALUES (?, ?, ?, ?, ?, ?)",
+            [_recipe(rng, items, tags, n) for n in range(start, min(size, start + chunk))],
+        )
+    conn.executemany(
+        "INSERT INTO planner_saves (name, data) VALUES (?, ?)",
+        [_planner_save(rng, items, size, n) for n in range(max(5, min(500, size // 100)))],
+    )
+    days = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    conn.executemany(
+        "INSERT INTO meal_plan (slot, recipe, link) VALUES (?, ?, ?)",
+        [(f"{d}_{m}", f"Recipe {rng.randint(1, size)}", "") for d in days for m in ("lunch", "dinner")],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO shopping_list (name, category) VALUES (?, ?)",
+        [(name, rng.choice(CATEGORIES)) for name in rng.sample(items, k=min(len(items), 80))],
+    )
+    conn.commit()
+    conn.close()
+    return path
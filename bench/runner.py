@@ -0,0 +1,152 @@
+"""
+Drive every route through Flask's test client and time it.
+
+measure() runs inside a fresh interpreter per corpus size (see __main__),
+so RECIPES_DB is set before app is imported and peak RSS belongs to that
+size alone. Each route reports p50/p95/p99/mean latency in ms, SQL
+statements per request (PRAGMAs and trigger firings excluded) and the HTTP statuses seen.
+"""
+import os
+import random
+import resource
+import sys
+import time
+
+import numpy as np
+
+SEARCH_TERMS = ["chicken", "pasta", "tomato", "garlic", "curry", "spinach", "lemon", "rice", "chick", "roast"]
+
+
+def _routes(ctx, semantic):
+    """(label, callable(rng) -> (method, url, kwargs)) for every route worth timing."""
+    rid = lambda rng: rng.randint(1, ctx["max_id"])
+    ids = lambda rng, k: ",".join(str(rid(rng)) for _ in range(k))
+    item = lambda rng: rng.choice(ctx["item_ids"])
+    plan = lambda rng: rng.choice(ctx["plan_ids"])
+
+    routes = [
+        ("GET /", lambda rng: ("GET", "/", {})),
+        ("GET /recipes", lambda rng: ("GET", "/recipes", {})),
+        ("GET /search?q", lambda rng: ("GET", f"/search?q={rng.choice(SEARCH_TERMS)}", {})),
+        ("GET /search?tag", lambda rng: ("GET", f"/search?tag={rng.choice(ctx['tags'])}", {})),
+        ("GET /search (all)", lambda rng: ("GET", "/search", {})),
+        ("GET /recipe/<id>", lambda rng: ("GET", f"/recipe/{rid(rng)}", {})),
+        ("GET /add", lambda rng: ("GET", "/add", {})),
+        ("GET /edit/<id>", lambda rng: ("GET", f"/edit/{rid(rng)}", {})),
+        ("POST /add", lambda rng: ("POST", "/add", {"data": {
+            "name": f"Bench Recipe {rng.random():.6f}", "ingredients": "200 g penne\n1 onion",
+            "method": "Cook.", "tags": ["pasta"]}})),
+        ("GET /planner", lambda rng: ("GET", "/planner", {})),
+        ("GET /api/selected", lambda rng: ("GET", f"/api/selected?ids={ids(rng, 7)}", {})),
+        ("GET /api/selected/aggregate", lambda rng: ("GET", f"/api/selected/aggregate?ids={ids(rng, 7)}", {})),
+        ("GET /api/shopping_list", lambda rng: ("GET", "/api/shopping_list", {})),
+        ("GET /api/shopping_list?since", lambda rng: ("GET", "/api/shopping_list?since=1", {})),
+        ("GET /api/shopping_list/suggestions", lambda rng: ("GET", f"/api/shopping_list/suggestions?q={rng.choice('abcdefghlmoprst')}", {})),
+        ("POST /api/shopping_list", lambda rng: ("POST", "/api/shopping_list", {"json": {
+            "name": f"bench item {rng.randint(1, 500)}", "category": "Other"}})),
+        ("PATCH /api/shopping_list/<id>", lambda rng: ("PATCH", f"/api/shopping_list/{item(rng)}", {"json": {
+            "crossed": rng.random() < 0.5}})),
+        ("POST /api/shopping_list/batch", lambda rng: ("POST", "/api/shopping_list/batch", {"json": [
+            {"op": "add", "name": f"batch item {rng.randint(1, 500)}"} for _ in range(20)]})),
+        ("GET /api/meal_plan", lambda rng: ("GET", "/api/meal_plan", {})),
+        ("GET /feed/mealplan", lambda rng: ("GET", "/feed/mealplan", {})),
+        ("GET /api/planner/list", lambda rng: ("GET", "/api/planner/list", {})),
+        ("GET /api/planner/load/<id>", lambda rng: ("GET", f"/api/planner/load/{plan(rng)}", {})),
+        ("POST /api/planner/save", lambda rng: ("POST", "/api/planner/save", {"json": {
+            "shopping_list": [{"name": "penne", "category": "Pantry"}], "recipes": [], "meal_plan": ""}})),
+        ("POST /api/planner/apply/<id>", lambda rng: ("POST", f"/api/planner/apply/{plan(rng)}", {})),
+    ]
+    if semantic:
+        routes.append(("GET /search?mode=semantic", lambda rng: (
+            "GET", f"/search?q={rng.choice(SEARCH_TERMS)}&mode=semantic", {})))
+    return routes
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _summary(samples_ms, queries, statuses):
+    a = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "n": len(a),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(a.mean()), 3),
+        "queries": round(float(np.mean(queries)), 1),
+        "statuses": sorted(set(statuses)),
+    }
+
+
+def measure(db_path, iterations=50, warmup=3, seed=0, semantic=False, only=None):
+    """Import the app against `db_path` and time every route."""
+    os.environ["RECIPES_DB"] = str(db_path)
+    t0 = time.perf_counter()
+    import app as recipe_app
+    startup_s = time.perf_counter() - t0
+
+    # count statements per request on every connection the app opens
+    counter = {"n": 0, "last": None}
+
+    def trace(sql):
+        # trigger firings (and executemany rows) are reported as repeats of
+        # the parent statement's text, so collapse consecutive duplicates
+        if sql == counter["last"] or sql.lstrip()[:6].upper().startswith(("PRAGMA", "--")):
+            return
+        counter["last"] = sql
+        counter["n"] += 1
+
+    connect = recipe_app.connect_db
+
+    def traced_connect(path=None):
+        conn = connect(path)
+        conn.set_trace_callback(trace)
+        return conn
+
+    recipe_app.connect_db = traced_connect
+
+    conn = connect()
+    ctx = {
+        "max_id": conn.execute("SELECT MAX(id) FROM recipes").fetchone()[0] or 1,
+        "item_ids": [r[0] for r in conn.execute("SELECT id FROM shopping_list")] or [1],
+        "plan_ids": [r[0] for r in conn.execute("SELECT id FROM planner_saves")] or [1],
+        "tags": [r[0] for r in conn.execute("SELECT DISTINCT tag FROM recipe_tags LIMIT 50")] or ["main"],
+        "recipes": conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0],
+    }
+    conn.close()
+
+    recipe_app.app.logger.disabled = True   # 500s are counted in "statuses", not printed
+    client = recipe_app.app.test_client()
+    rng = random.Random(seed)
+    results = {}
+    for label, make in _routes(ctx, semantic):
+        if only and not any(o in label for o in only):
+            continue
+        samples, queries, statuses = [], [], []
+        for i in range(warmup + iterations):
+            method, url, kwargs = make(rng)
+            counter["n"], counter["last"] = 0, None
+            t = time.perf_counter()
+            resp = client.open(url, method=method, **kwargs)
+            resp.get_data()
+            elapsed = (time.perf_counter() - t) * 1000
+            resp.close()
+            if i >= warmup:
+                samples.append(elapsed)
+                queries.append(counter["n"])
+                statuses.append(resp.status_code)
+        results[label] = _summary(samples, queries, statuses)
+        r = results[label]
+        print(f"  {label:<38} p50 {r['p50_ms']:>9.2f}  p95 {r['p95_ms']:>9.2f}  "
+              f"p99 {r['p99_ms']:>9.2f} ms  q/req {r['queries']:>6}  {r['statuses']}", flush=True)
+
+    return {
+        "recipes": ctx["recipes"],
+        "startup_s": round(startup_s, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "routes": results,
+    }
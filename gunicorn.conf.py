@@ -0,0 +1,53 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# Sized for a Raspberry Pi: two workers share one copy of spaCy, the recipe
+# vectors and the trigram index (preload_app + warm_master), each with a few
+# threads. gthread keeps the planner's live-update stream (SSE) from pinning
+# a whole worker; each open stream holds one thread, so threads must exceed
+# the number of planner tabs you keep open.
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get("RECIPES_BIND", "0.0.0.0:5050")
+workers = int(os.environ.get("RECIPES_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("RECIPES_THREADS", 4))
+preload_app = True
+timeout = 60             # a rebuild-heavy request on a cold SD card
+graceful_timeout = 20    # SSE streams never finish on their own
+keepalive = 5
+max_requests = 2000      # recycle a worker whose memory crept up...
+max_requests_jitter = 200  # ...but not all of them at once
+
+# /metrics sums over all workers through prometheus_client's multiprocess
+# directory. It has to be set before app.py imports prometheus_client, and
+# emptied once per master start: HUP re-reads this file and USR2 re-execs
+# with our environment, and neither should reset the counters.
+_shm = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+_port = bind.rsplit(":", 1)[-1]
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(_shm, f"recipes-metrics-{_port}"))
+if not os.environ.get("RECIPES_METRICS_DIR_READY"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+    os.environ["RECIPES_METRICS_DIR_READY"] = "1"
+
+
+def when_ready(server):
+    import app
+    app.warm_master()
+
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
+
+
+def worker_exit(server, worker):
+    import app
+    app.similar_worker.stop()   # hand the drain lease to another worker now
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -30,6 +30,7 @@ const categories = [
 
 
 let items = [];
+let listVersion = null;   // server list version of `items` (see ?since=)
 
 // Prevent double add when selecting from suggestions
 window.selectingSuggestion = false;
@@ -39,15 +40,37 @@ window.selectingSuggestion = false;
    =============================== */
 async function loadShoppingList() {
   try {
-    const res = await fetch("/api/shopping_list");
-    items = await res.json();   // <— replaces the array, not append
+    if (listVersion === null) {
+      // Full load; the browser revalidates with If-None-Match (304 if unchanged)
+      const res = await fetch("/api/shopping_list");
+      items = await res.json();   // <— replaces the array, not append
+      listVersion = Number(res.headers.get("X-List-Version")) || null;
+    } else {
+      // Only rows changed since our last known version
+      const res = await fetch(`/api/shopping_list?since=${listVersion}`);
+      if (!res.ok) throw new Error(await res.text());
+      applyListDelta(await res.json());
+    }
   } catch (err) {
     console.error("Failed to load shopping list:", err);
     items = [];
+    listVersion = null;
   }
   renderShoppingList();
 }
 
+function applyListDelta(delta) {
+  const gone = new Set(delta.deleted || []);
+  (delta.items || []).forEach(row => {
+    const lower = row.name.toLowerCase();
+    // drop the old copy (same id, or same name under a replaced id)
+    items = items.filter(i => i.id !== row.id && i.name.toLowerCase() !== lower);
+    if (row.active) items.push(row);
+  });
+  items = items.filter(i => !gone.has(i.id));
+  listVersion = delta.version;
+}
+
 function renderShoppingList() {
   listContainer.innerHTML = "";
 
@@ -113,6 +136,7 @@ function attachHandlers() {
       // update UI immediately
       span.style.textDecoration = crossed ? "line-through" : "none";
       span.style.opacity = crossed ? "0.6" : "1";
+      setLocalField(id, "crossed", crossed);
 
       try {
         const res = await fetch(`/api/shopping_list/${id}`, {
@@ -147,7 +171,7 @@ function attachHandlers() {
         const res = await fetch(`/api/shopping_list/${id}`, { method: "DELETE" });
         if (res.ok) {
           showToast(`🗑️ "${name}" removed`, "warn");
-          await loadShoppingList();
+          if (!liveSync) await loadShoppingList();
         } else {
           showToast("⚠️ Delete failed", "warn");
           li.style.color = "";
@@ -165,6 +189,7 @@ function attachHandlers() {
     inp.oninput = async () => {
       const id = inp.dataset.id;
       const amount = inp.value.trim();
+      setLocalField(id, "amount", amount);
       try {
         const res = await fetch(`/api/shopping_list/${id}`, {
           method: "PATCH",
@@ -199,7 +224,7 @@ if (clearBtn) {
       try {
         await fetch("/api/shopping_list/clear", { method: "POST" });
         showToast("🧹 Shopping list cleared", "success");
-        await loadShoppingList();
+        if (!liveSync) await loadShoppingList();
       } catch (err) {
         console.error("Clear failed:", err);
         showToast("⚠️ Couldn't clear list", "warn");
@@ -273,7 +298,7 @@ function enableDragDrop() {
           body: JSON.stringify({ category: newCat })
         });
         if (!res.ok) throw new Error(await res.text());
-        await loadShoppingList();
+        if (!liveSync) await loadShoppingList();
       } catch (err) {
         console.error("Category move failed:", err);
       }
@@ -391,6 +416,49 @@ async function addNewItem(name, category) {
 
 
 
+/* ===============================
+   6A. Add many items at once (one request, one commit)
+   =============================== */
+async function addItemsBatch(entries) {
+  // entries: [{ name, category }] — category null keeps the stored one
+  const ops = entries.map(({ name, category }) => {
+    const existing = items.find(i => i.name.toLowerCase() === name.toLowerCase());
+    return {
+      op: "add",
+      name,
+      category: (existing && existing.category) || category || null
+    };
+  });
+  if (!ops.length) return [];
+
+  try {
+    const res = await fetch("/api/shopping_list/batch", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ops })
+    });
+    if (!res.ok) {
+      console.error("Batch add failed:", await res.text());
+      return [];
+    }
+
+    const data = await res.json();
+    const returned = data.items || [];
+    returned.forEach(row => {
+      const idx = items.findIndex(i => i.id === row.id);
+      if (idx >= 0) items[idx] = row;
+      else items.push(row);
+    });
+    renderShoppingList();
+    return returned;
+  } catch (err) {
+    console.error("addItemsBatch() failed:", err);
+    return [];
+  }
+}
+
+
+
 /* ===============================
    6B. Suggestion dropdown with keyboard navigation
    =============================== */
@@ -601,11 +669,17 @@ const planData = await loadRes.json();
 
 console.log("Loaded plan:", planData);
 
-// 🧩 Apply the shopping list to the live DB (so it persists)
-await fetch(`/api/planner/apply/${choice.trim()}`, { method: "POST" });
-
-// 🧩 Then reload the shopping list from DB
-await loadShoppingList();
+// 🧩 Apply the shopping list to the live DB (so it persists).
+// The server answers with the diff; patch our copy when it was computed
+// against exactly our version, otherwise reload from the DB.
+const applyRes = await fetch(`/api/planner/apply/${choice.trim()}`, { method: "POST" });
+const applied = applyRes.ok ? await applyRes.json() : null;
+if (applied && listVersion !== null && applied.base_version === listVersion) {
+  applyListDelta(applied);
+  renderShoppingList();
+} else {
+  await loadShoppingList();
+}
 
 // === Apply loaded plan data to UI (supports old + new formats) ===
 if (!planData || Object.keys(planData).length === 0) {
@@ -620,10 +694,9 @@ localStorage.removeItem("salimaPlannerV3_excluded");
       const mealHTML = planData.mealPlanHTML || planData.meal_plan || "";
       const recipes = planData.recipes || [];
 
-      // 1️⃣ Restore shopping list
-      if (Array.isArray(shoppingList) && shoppingList.length > 0) {
-        items = shoppingList;
-        renderShoppingList();
+      // 1️⃣ Shopping list: already restored from the apply diff above
+      if (!Array.isArray(shoppingList) || shoppingList.length === 0) {
+        console.warn("Saved plan has no shopping list");
       }
 
       // 2️⃣ Restore recipes + ingredients
@@ -830,6 +903,67 @@ if (checklistToggleBtn) {
 
 
 /* ===============================
-   12. Init
+   12. Live sync (Server-Sent Events)
+   =============================== */
+let liveSync = false;   // true while the stream is connected
+
+function setLocalField(id, field, value) {
+  const item = items.find(i => String(i.id) === String(id));
+  if (item) item[field] = value;
+}
+
+function sameItem(a, b) {
+  return a && b && a.name === b.name && a.category === b.category &&
+    (a.amount || "") === (b.amount || "") && !!a.crossed === !!b.crossed &&
+    !!a.active === !!b.active;
+}
+
+// Re-render, keeping focus/caret in an amount box the user is typing in
+function renderKeepingFocus() {
+  const focused = document.activeElement;
+  const focusId = focused && focused.classList.contains("amount-input") ? focused.dataset.id : null;
+  const caret = focusId ? focused.selectionStart : null;
+  renderShoppingList();
+  if (focusId) {
+    const again = listContainer.querySelector(`.amount-input[data-id="${focusId}"]`);
+    if (again) {
+      again.focus();
+      again.setSelectionRange(caret, caret);
+    }
+  }
+}
+
+function startLiveSync() {
+  if (!window.EventSource) return;
+  const since = listVersion !== null ? `?since=${listVersion}` : "";
+  const source = new EventSource(`/api/shopping_list/stream${since}`);
+
+  source.addEventListener("open", () => { liveSync = true; });
+  source.addEventListener("error", () => { liveSync = false; });   // browser retries + resumes
+
+  source.addEventListener("item", e => {
+    const row = JSON.parse(e.data);
+    const current = items.find(i => i.id === row.id);
+    listVersion = Number(e.lastEventId) || listVersion;
+    if (row.active ? sameItem(current, row) : !current) return;   // our own echo
+    applyListDelta({ items: [row], deleted: [], version: listVersion });
+    renderKeepingFocus();
+  });
+
+  source.addEventListener("delete", e => {
+    const { id } = JSON.parse(e.data);
+    listVersion = Number(e.lastEventId) || listVersion;
+    if (!items.some(i => i.id === id)) return;
+    applyListDelta({ items: [], deleted: [id], version: listVersion });
+    renderKeepingFocus();
+  });
+}
+
+
+/* ===============================
+   13. Init
    =============================== */
-document.addEventListener("DOMContentLoaded", loadShoppingList);
+document.addEventListener("DOMContentLoaded", async () => {
+  await loadShoppingList();
+  startLiveSync();
+});
@@ -92,7 +92,8 @@ function renderRecipes(meals) {
         return;
       }
 
-      let addedCount = 0;
+      const entries = [];
+      const boxes = [];
 
       for (const box of checkedBoxes) {
         const ingredientName = (box.dataset.ing || "").trim();
@@ -102,16 +103,25 @@ function renderRecipes(meals) {
         let cat = detectCategory(ingredientName);
         if (!cat || cat === "Other") cat = null;
 
-        await addNewItem(ingredientName, cat);
-        addedCount++;
+        entries.push({ name: ingredientName, category: cat });
+        boxes.push(box);
+      }
 
-        // Visual feedback
+      // 📦 One round trip for the whole selection
+      const added = await addItemsBatch(entries);
+      if (!added.length) {
+        showToast("⚠️ Couldn't add ingredients", "warn");
+        return;
+      }
+
+      // Visual feedback
+      boxes.forEach(box => {
         box.checked = false;
         box.disabled = true;
         box.style.opacity = "0.5";
-      }
+      });
 
-      showToast(`✅ Added ${addedCount} ingredients to shopping list.`);
+      showToast(`✅ Added ${entries.length} ingredients to shopping list.`);
     });
   }
 